@@ -0,0 +1,271 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import (Blueprint, Response, abort, current_app, jsonify, request,
+                   stream_with_context)
+
+import schedule
+import search
+from browse import venue_areas, artist_listing
+from details import load_venue, load_artist
+from exporter import FORMATS, encoded
+from genres import genre_counts
+from feeds import shows_feed, UPCOMING, PAST
+from pagination import encode_cursor, decode_cursor
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder produces the same bytes, just slower
+    orjson = None
+
+#----------------------------------------------------------------------------#
+# JSON API, version 1.
+#
+#   GET /api/v1/venues            ?genre=&after=&limit=&fields=
+#   GET /api/v1/venues/<id>       ?fields=
+#   GET /api/v1/venues/search     ?q=&genre=&limit=&fields=
+#   GET /api/v1/artists, /artists/<id>, /artists/search   (as above)
+#   GET /api/v1/shows             ?when=upcoming|past&from=&to=&after=&limit=&fields=
+#   GET /api/v1/genres            venue and artist counts per genre
+#   GET /api/v1/calendar          ?from=&to=&venue_id=&artist_id=&city=&state=&genre=
+#   GET /api/v1/calendar/buckets  ?from=&to=&by=day|week&... (filters as above)
+#
+# Lists come back as {"data": [...], "next": cursor or null}, searches with
+# the total "count" too; pass ``next`` as ``after`` for the following page.
+# ``fields`` is a comma-separated list of the keys to keep. Responses carry
+# an ETag over the encoded body and answer If-None-Match with 304, except
+# the calendar, which streams every show in the window as NDJSON (a window
+# may span at most CALENDAR_MAX_DAYS). Times are ISO 8601.
+#----------------------------------------------------------------------------#
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+VENUE_LIST_FIELDS = ('id', 'name', 'city', 'state', 'num_upcoming_shows')
+ARTIST_LIST_FIELDS = ('id', 'name')
+SEARCH_FIELDS = ('id', 'name', 'num_upcoming_shows')
+SHOW_FIELDS = ('id', 'start_time', 'venue_id', 'venue_name', 'artist_id',
+               'artist_name', 'artist_image_link')
+DETAIL_FIELDS = ('id', 'name', 'genres', 'city', 'state', 'phone', 'website',
+                 'facebook_link', 'image_link', 'seeking_description',
+                 'past_shows', 'upcoming_shows', 'past_shows_count',
+                 'upcoming_shows_count')
+VENUE_FIELDS = DETAIL_FIELDS + ('address', 'seeking_talent')
+ARTIST_FIELDS = DETAIL_FIELDS + ('seeking_venue',)
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+
+def dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def api_response(payload):
+    body = dumps(payload)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(hashlib.blake2b(body, digest_size=16).hexdigest())
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+#----------------------------------------------------------------------------#
+# Arguments.
+#----------------------------------------------------------------------------#
+
+
+def int_arg(name, default, maximum):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    if not value.isdigit() or not 0 < int(value) <= maximum:
+        abort(400, f'{name} must be between 1 and {maximum}')
+    return int(value)
+
+
+def page_limit(default):
+    return int_arg('limit', default, current_app.config['API_MAX_PAGE_SIZE'])
+
+
+def time_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, f'{name} must be an ISO 8601 time')
+
+
+def window_args():
+    """``(start, end, filters)`` for the calendar endpoints."""
+    start, end = time_arg('from'), time_arg('to')
+    if start is None or end is None:
+        abort(400, 'from and to are required')
+    if not timedelta(0) < end - start <= timedelta(days=current_app.config['CALENDAR_MAX_DAYS']):
+        abort(400, 'to must be after from, by at most {} days'.format(
+            current_app.config['CALENDAR_MAX_DAYS']))
+    filters = {name: request.args.get(name) for name in ('city', 'state', 'genre')}
+    for name in ('venue_id', 'artist_id'):
+        value = request.args.get(name)
+        if value is not None and not value.isdigit():
+            abort(400, f'{name} must be an id')
+        filters[name] = int(value) if value is not None else None
+    return start, end, filters
+
+
+def after_arg(types):
+    after = request.args.get('after')
+    if after is None:
+        return None
+    try:
+        return decode_cursor(after, types)
+    except ValueError:
+        abort(400, 'invalid cursor')
+
+
+def field_selector(allowed):
+    """A function trimming a record to the requested ``fields``, or None for all."""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    wanted = [field for field in fields.split(',') if field]
+    unknown = [field for field in wanted if field not in allowed]
+    if unknown:
+        abort(400, 'unknown fields: ' + ', '.join(unknown))
+    return lambda record: {field: record[field] for field in wanted}
+
+
+def listing(records, allowed, next_after=None, **extra):
+    select = field_selector(allowed)
+    if select is not None:
+        records = [select(record) for record in records]
+    return api_response(dict(extra, data=records, next=(
+        encode_cursor(next_after) if next_after is not None else None)))
+
+
+def detail(record, allowed):
+    if record is None:
+        abort(404)
+    select = field_selector(allowed)
+    return api_response(select(record) if select is not None else record)
+
+#----------------------------------------------------------------------------#
+# Endpoints.
+#----------------------------------------------------------------------------#
+
+
+@api.route('/venues')
+def venues():
+    after = after_arg((str, str, str, int))
+    areas, next_after = venue_areas(
+        after=after, genre=request.args.get('genre'),
+        limit=page_limit(current_app.config['LISTING_PAGE_SIZE']))
+    records = [dict(venue, city=area['city'], state=area['state'])
+               for area in areas for venue in area['venues']]
+    return listing(records, VENUE_LIST_FIELDS, next_after)
+
+
+@api.route('/venues/<int:venue_id>')
+def venue(venue_id):
+    return detail(load_venue(venue_id, limit=current_app.config['DETAIL_SHOWS_LIMIT'],
+                             time_format=TIME_FORMAT), VENUE_FIELDS)
+
+
+@api.route('/venues/search')
+def search_venues():
+    results = search.search_venues(
+        request.args.get('q', ''), genre=request.args.get('genre'),
+        limit=page_limit(current_app.config['SEARCH_RESULTS_LIMIT']))
+    return listing(results['data'], SEARCH_FIELDS, count=results['count'])
+
+
+@api.route('/artists')
+def artists():
+    after = after_arg((str, int))
+    rows, next_after = artist_listing(
+        after=after, genre=request.args.get('genre'),
+        limit=page_limit(current_app.config['LISTING_PAGE_SIZE']))
+    return listing([{'id': row.id, 'name': row.name} for row in rows],
+                   ARTIST_LIST_FIELDS, next_after)
+
+
+@api.route('/artists/<int:artist_id>')
+def artist(artist_id):
+    return detail(load_artist(artist_id, limit=current_app.config['DETAIL_SHOWS_LIMIT'],
+                              time_format=TIME_FORMAT), ARTIST_FIELDS)
+
+
+@api.route('/artists/search')
+def search_artists():
+    results = search.search_artists(
+        request.args.get('q', ''), genre=request.args.get('genre'),
+        limit=page_limit(current_app.config['SEARCH_RESULTS_LIMIT']))
+    return listing(results['data'], SEARCH_FIELDS, count=results['count'])
+
+
+@api.route('/shows')
+def shows():
+    when = request.args.get('when')
+    if when not in (None, UPCOMING, PAST):
+        abort(400, 'when must be upcoming or past')
+    records, next_after = shows_feed(
+        when=when, start=time_arg('from'), end=time_arg('to'),
+        after=after_arg((datetime, int)),
+        limit=page_limit(current_app.config['SHOWS_PAGE_SIZE']),
+        time_format=TIME_FORMAT)
+    return listing(records, SHOW_FIELDS, next_after)
+
+
+@api.route('/genres')
+def genres():
+    return api_response({'data': genre_counts()})
+
+
+@api.route('/calendar')
+def calendar():
+    start, end, filters = window_args()
+    chunks = schedule.calendar_chunks(start, end, 'ndjson', **filters)
+    return Response(stream_with_context(encoded(chunks)), mimetype=FORMATS['ndjson'])
+
+
+@api.route('/calendar/buckets')
+def calendar_buckets():
+    by = request.args.get('by', 'day')
+    if by not in schedule.BUCKETS:
+        abort(400, 'by must be day or week')
+    start, end, filters = window_args()
+    buckets = schedule.calendar_buckets(start, end, by, **filters)
+    return api_response({'by': by, 'data': [
+        {'start': bucket['start'].isoformat(), 'count': bucket['count']}
+        for bucket in buckets]})
+
+
+# Registered per code: the app's own handlers render HTML and would
+# otherwise take precedence over a blueprint-wide HTTPException handler.
+@api.errorhandler(400)
+@api.errorhandler(404)
+@api.errorhandler(405)
+@api.errorhandler(500)
+def api_error(e):
+    return jsonify({'error': e.name, 'description': e.description}), e.code
+
+
+def json_errors(handler):
+    """Wrap an app error handler to answer in JSON under /api/v1.
+
+    Errors raised before a request reaches the blueprint (an unmatched URL,
+    a method it does not allow) only see the app's handlers.
+    """
+    @wraps(handler)
+    def wrapper(e):
+        if request.path == api.url_prefix or request.path.startswith(api.url_prefix + '/'):
+            return api_error(e)
+        return handler(e)
+    return wrapper
+
+
+def init_app(app):
+    app.config.setdefault('API_MAX_PAGE_SIZE', 500)
+    app.register_blueprint(api)
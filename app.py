@@ -7,17 +7,20 @@ from operator import add
 from os import stat
 import sys
 from venv import create
-import dateutil.parser
-import babel
 from flask import (Flask,
                    render_template,
                    request,
                    Response,
                    flash,
                    redirect,
-                   url_for)
+                   url_for,
+                   abort,
+                   make_response,
+                   jsonify,
+                   session)
 from flask_moment import Moment
 from flask_migrate import Migrate
+from werkzeug.http import is_resource_modified
 
 from sqlalchemy import (ARRAY,
                         String,
@@ -27,6 +30,30 @@ from logging import Formatter, FileHandler
 from flask_wtf import FlaskForm as BaseForm
 from forms import *
 from models import db,  Artist, Venue, Show
+from browse import venue_areas, artist_listing
+from genres import genre_facets
+from conflicts import booking_conflicts, UnknownOwner
+from details import load_venue, load_artist, page_validators
+from feeds import shows_feed, UPCOMING, PAST
+from pagination import encode_cursor, decode_cursor
+import api
+import areas
+import assets
+import pooling
+import replicas
+import recent
+import rendering
+import schedule
+import exporter, importer
+import search
+import seed
+import sqlprofile
+import autocomplete
+import conflicts
+import counters
+import genres
+import thumbnails
+from cache import page_cache
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -35,24 +62,71 @@ from models import db,  Artist, Venue, Show
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
+pooling.init_app(app)
 db.init_app(app)
+replicas.init_app(app)
 migrate = Migrate(app, db)
+sqlprofile.init_app(app)
+search.init_app(app)
+seed.init_app(app)
+counters.init_app(app)
+conflicts.init_app(app)
+schedule.init_app(app)
+genres.init_app(app)
+importer.init_app(app)
+exporter.init_app(app)
+autocomplete.init_app(app)
+api.init_app(app)
+areas.init_app(app)
+recent.init_app(app)
+thumbnails.init_app(app)
+assets.init_app(app)
+page_cache.init_app(app)
+rendering.init_app(app)
 
 #----------------------------------------------------------------------------#
-# Filters.
+# Pagination.
 #----------------------------------------------------------------------------#
 
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format = "EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format = "EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format, locale='en')
+def cursor_arg(types):
+    after = request.args.get('after')
+    if after is None:
+        return None
+    try:
+        return decode_cursor(after, types)
+    except ValueError:
+        abort(400)
+
+
+def next_page_url(endpoint, next_after):
+    if next_after is None:
+        return None
+    args = dict(request.view_args, **request.args.to_dict())
+    args['after'] = encode_cursor(next_after)
+    return url_for(endpoint, **args)
+
+#----------------------------------------------------------------------------#
+# Conditional GET.
+#----------------------------------------------------------------------------#
 
 
-app.jinja_env.filters['datetime'] = format_datetime
+def detail_page(model, owner_key, entity_id, render):
+    """Render a venue/artist page, or answer 304 from its version alone."""
+    validators = page_validators(model, owner_key, entity_id)
+    if validators is None:
+        abort(404)
+    etag, last_modified = validators
+    # Pages carrying flashed messages must be rendered to deliver them.
+    if session.get('_flashes') or is_resource_modified(
+            request.environ, etag=etag, last_modified=last_modified):
+        response = make_response(render())
+    else:
+        response = Response(status=304)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
 
 #----------------------------------------------------------------------------#
 # Controllers.
@@ -60,121 +134,70 @@ app.jinja_env.filters['datetime'] = format_datetime
 
 
 @app.route('/')
+@page_cache.cached('venues', 'artists')
 def index():
-    venues = Venue.query.order_by(desc(Venue.created_date)).limit(10).all()
-    artists = Artist.query.order_by(desc(Artist.created_date)).limit(10).all()
-    return render_template('pages/home.html', venues=venues, artists=artists)
+    recent.venues.ensure_loaded()
+    recent.artists.ensure_loaded()
+    return render_template('pages/home.html', venues=recent.venues.latest(),
+                           artists=recent.artists.latest())
 
 
 #  Venues
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@page_cache.cached('venues', 'shows')
 def venues():
-
-    venue_all = Venue.query.all()
-    places = set()
-    all_data = []
-    for venue in list(venue_all):
-        data = dict()
-        time_now = datetime.now()
-        all_upcoming_shows = venue.shows.filter(
-            Show.start_time > time_now).all()
-
-        if venue.state in places:
-            all_data[-1]['venues'].append({
-                'id': venue.id,
-                'name': venue.name,
-                'num_upcoming_shows': len(all_upcoming_shows),
-            })
-
-        else:
-            data['city'] = venue.city if venue.city != None else 'venue city'
-            data['state'] = venue.state if venue.state != None else 'venue city'
-            data['venues'] = [{
-                'id': venue.id,
-                'name': venue.name,
-                'num_upcoming_shows': len(all_upcoming_shows),
-            }]
-            places.add(venue.state)
-
-        all_data.append(data)
-
-    print(all_data)
-    return render_template('pages/venues.html', areas=all_data)
+    after = cursor_arg((str, str, str, int))
+    genre = request.args.get('genre')
+    areas, next_after = venue_areas(after=after, genre=genre,
+                                    limit=app.config['LISTING_PAGE_SIZE'])
+    return render_template('pages/venues.html', areas=areas, genre=genre,
+                           facets=genre_facets(Venue),
+                           next_url=next_page_url('venues', next_after))
+
+
+@app.route('/venues/<state>')
+def venues_in_state(state):
+    state = state.upper()
+    if state not in STATES:
+        abort(404)
+    areas.venues.ensure_loaded()
+    return render_template('pages/venues_state.html', state=state,
+                           cities=areas.venues.cities(state))
+
+
+@app.route('/venues/<state>/<city>')
+def venues_in_city(state, city):
+    areas.venues.ensure_loaded()
+    venues, next_after = areas.venues.venues(
+        state.upper(), city, after=cursor_arg((str, int)),
+        limit=app.config['LISTING_PAGE_SIZE'])
+    if venues is None:
+        abort(404)
+    return render_template('pages/venues_city.html', state=state.upper(), city=city,
+                           venues=venues,
+                           next_url=next_page_url('venues_in_city', next_after))
 
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
-
     search_term = request.form.get('search_term', '')
-    search_term = '%' + search_term + '%'
-    count = Venue.query.filter(Venue.name.ilike(search_term)).count()
-
-    data = []
-    for i in Venue.query.filter(Venue.name.ilike(search_term)):
-        res = {
-            'id': i.id,
-            'name': i.name,
-            'num_upcoming_shows': Show.query.filter_by(venue_id=i.id).filter(Show.start_time >= datetime.today()).count()
-        }
-        data.append(res)
-        response = {
-            'count': count,
-            'data': data
-        }
-
-    return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+    genre = request.form.get('genre')
+    response = search.search_venues(
+        search_term, limit=app.config['SEARCH_RESULTS_LIMIT'], genre=genre, facets=True)
+    return render_template('pages/search_venues.html', results=response,
+                           search_term=search_term, genre=genre)
 
 
 @app.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
-
-    venue_query = Venue.query.get(venue_id)
-    data = dict()
-    if venue_query:
-        data['id'] = venue_query.id,
-        data['name'] = venue_query.name
-        data['genres'] = venue_query.genres
-        data['address'] = venue_query.address
-        data['city'] = venue_query.city
-        data['phone'] = venue_query.phone
-        data['website'] = venue_query.website
-        data['facebook_link'] = venue_query.facebook_link
-        data['seeking_talent'] = venue_query.seeking_talent
-        data['seeking_description'] = venue_query.seeking_description
-        data['image-link'] = venue_query.image_link
-        past_shows = Show.query.options(db.joinedload(Show.Venue)).filter(
-            Show.venue_id == venue_id).filter(Show.start_time <= datetime.now()).all()
-        past_show_all = []
-        for show in past_shows:
-            past_show_all.append(
-                {
-                    'artist_id': show.artist_id,
-                    'artist_name': show.Artist.name,
-                    'artist_image_link': show.Artist.image_link,
-                    'start_time':  show.start_time.strftime('%Y-%m-%d %H:M:%S')
-                }
-            )
-        data['past_shows'] = past_show_all
-        new_shows = Show.query.options(db.joinedload(Show.Venue)).filter(
-            Show.venue_id == venue_id).filter(Show.start_time > datetime.now()).all()
-        new_show_all = []
-        for show in new_shows:
-            new_show_all.append(
-                {
-                    'artist_id': show.artist_id,
-                    'artist_name': show.Artist.name,
-                    'artist_image_link': show.Artist.image_link,
-                    'start_time':  show.start_time.strftime('%Y-%m-%d %H:M:%S')
-                }
-            )
-        data['upcoming_shows'] = new_show_all
-        data['past_shows_count'] = len(past_show_all)
-        data['upcoming_shows_count'] = len(new_show_all)
-
+    def render():
+        data = load_venue(venue_id, limit=app.config['DETAIL_SHOWS_LIMIT'])
+        if data is None:
+            abort(404)
         return render_template('pages/show_venue.html', venue=data)
-    return "{'error': 'venue not found'}"
+    return detail_page(Venue, 'venue_id', venue_id, render)
 
 #  Create Venue
 #  ----------------------------------------------------------------
@@ -209,6 +232,11 @@ def create_venue_submission():
         try:
             db.session.add(created_venue)
             db.session.commit()
+            autocomplete.venues.put(created_venue.id, created_venue.name)
+            areas.venues.put(created_venue.id, created_venue.state,
+                             created_venue.city, created_venue.name)
+            recent.venues.push(created_venue.id, created_venue.name)
+            page_cache.invalidate('venues')
             flash(f'Venue {created_venue.name} was successfully listed!')
 
         except Exception as e:
@@ -224,97 +252,66 @@ def create_venue_submission():
     return render_template('pages/home.html')
 
 
-@app.route('/venues/<venue_id>', methods=['DELETE'])
+@app.route('/venues/<int:venue_id>', methods=['DELETE'])
 def delete_venue(venue_id):
+    venue = db.session.get(Venue, venue_id)
+    if venue is None:
+        abort(404)
     try:
-        Venue.query.filter_by(id=venue_id).delete()
+        # Through the session, not a bulk delete, so the genre, show
+        # counter and version hooks in models.py run.
+        db.session.delete(venue)
         db.session.commit()
-    except:
+        autocomplete.venues.remove(venue_id)
+        areas.venues.remove(venue_id)
+        recent.venues.remove(venue_id)
+        page_cache.invalidate('venues', 'shows')
+        deleted = True
+    except Exception:
         db.session.rollback()
+        print(sys.exc_info())
+        deleted = False
     finally:
         db.session.close()
 
     # BONUS CHALLENGE: Implement a button to delete a Venue on a Venue Page, have it so that
     # clicking that button delete it from the db then redirect the user to the homepage
-    return None
+    return jsonify({'success': deleted}), 200 if deleted else 500
 
 #  Artists
 #  ----------------------------------------------------------------
 
 
 @app.route('/artists')
+@page_cache.cached('artists')
 def artists():
-    # TODO: replace with real data returned from querying the database
-    artists_all = Artist.query.all()
-    # return render_template('pages/artists.html', artists=data)
-    return render_template('pages/artists.html', artists=artists_all)
+    after = cursor_arg((str, int))
+    genre = request.args.get('genre')
+    rows, next_after = artist_listing(after=after, genre=genre,
+                                      limit=app.config['LISTING_PAGE_SIZE'])
+    return render_template('pages/artists.html', artists=rows, genre=genre,
+                           facets=genre_facets(Artist),
+                           next_url=next_page_url('artists', next_after))
 
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
-    search_term: String = request.form['search_term']
-    query = Artist.query.filter(Artist.name.ilike(f'%{search_term}%'))
-    response = {
-        'count': len(list(query)),
-        'data': []
-    }
-    for artist in query:
-        response['data'].append(
-            {
-                'id': artist.id,
-                'name': artist.name,
-            }
-        )
-    return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
+    search_term = request.form.get('search_term', '')
+    genre = request.form.get('genre')
+    response = search.search_artists(
+        search_term, limit=app.config['SEARCH_RESULTS_LIMIT'], genre=genre, facets=True)
+    return render_template('pages/search_artists.html', results=response,
+                           search_term=search_term, genre=genre)
 
 
 @app.route('/artists/<int:artist_id>')
 def show_artist(artist_id):
-    artist_query = Artist.query.get(artist_id)
-    data: dict = {}
-    if artist_query:
-        data['id'] = artist_query.id
-        data['name'] = artist_query.name
-        data['genres'] = artist_query.genres
-        data['city'] = artist_query.city
-        data['state'] = artist_query.state
-        data['phone'] = artist_query.phone
-        data['website'] = artist_query.website
-        data['facebook_link'] = artist_query.facebook_link
-        data['seeking_venue'] = artist_query.seeking_venue
-        data['seeking_description'] = artist_query.seeking_description
-        data['image_link'] = artist_query.image_link
-
-        past_shows = Show.query.options(db.joinedload(Show.artist)).filter(
-            Show.artist_id == artist_id).filter(Show.start_time <= datetime.now()).all()
-        past_show_all = []
-        for show in past_shows:
-            past_show_all.append(
-                {
-                    'venue_id': show.venue_id,
-                    'venue_name': show.Venue.name,
-                    'venue_image_link': show.Venue.image_link,
-                    'start_time':  show.start_time.strftime('%Y-%m-%d %H:M:%S')
-                }
-            )
-        data['past_shows'] = past_show_all
-        new_shows = Show.query.options(db.joinedload(Show.artist)).filter(
-            Show.artist_id == artist_id).filter(Show.start_time > datetime.now()).all()
-        new_show_all = []
-        for show in new_shows:
-            new_show_all.append(
-                {
-                    'venue_id': show.venue_id,
-                    'venue_name': show.Venue.name,
-                    'venue_image_link': show.Venue.image_link,
-                    'start_time':  show.start_time.strftime('%Y-%m-%d %H:M:%S')
-                }
-            )
-        data['upcoming_shows'] = new_show_all
-        data['past_shows_count'] = len(past_show_all)
-        data['upcoming_shows_count'] = len(new_show_all)
-
-    return render_template('pages/show_artist.html', artist=data)
+    def render():
+        data = load_artist(artist_id, limit=app.config['DETAIL_SHOWS_LIMIT'])
+        if data is None:
+            abort(404)
+        return render_template('pages/show_artist.html', artist=data)
+    return detail_page(Artist, 'artist_id', artist_id, render)
 
 #  Update
 #  ----------------------------------------------------------------
@@ -353,8 +350,8 @@ def edit_artist_submission(artist_id):
             artist.city = form.city.data
             artist.state = form.state.data
             artist.phone = form.phone.data
-            artist.website = form.website.data
-            artist.genres = ".".join(form.genres.data)
+            artist.website = form.website_link.data
+            artist.genres = ",".join(form.genres.data)
             artist.image_link = form.image_link.data
             artist.facebook_link = form.facebook_link.data
             artist.seeking_venue = form.seeking_venue.data
@@ -362,6 +359,9 @@ def edit_artist_submission(artist_id):
 
             db.session.add(artist)
             db.session.commit()
+            autocomplete.artists.put(artist.id, artist.name)
+            recent.artists.put(artist.id, artist.name)
+            page_cache.invalidate('artists')
             flash(' Artist ' + artist.name + ' is successfully edited!')
         except:
             db.session.rollback()
@@ -369,8 +369,10 @@ def edit_artist_submission(artist_id):
             flash(' Unsuccessful editing attempt.')
         finally:
             db.session.close()
+    else:
+        flash(' Unsuccessful editing attempt.')
 
-        return redirect(url_for('show_artist', artist_id=artist_id))
+    return redirect(url_for('show_artist', artist_id=artist_id))
 
 
 @app.route('/venues/<int:venue_id>/edit', methods=['GET'])
@@ -395,13 +397,17 @@ def edit_venue_submission(venue_id):
             venue.phone = form.phone.data
             venue.image_link = form.image_link.data
             venue.facebook_link = form.facebook_link.data
-            venue.website = form.website.data
+            venue.website = form.website_link.data
             venue.seeking_talent = form.seeking_talent.data
             venue.seeking_description = form.seeking_description.data
-            venue.genres = ",".join(form.genres.data)
+            venue.genres = form.genres.data
 
             db.session.add(venue)
             db.session.commit()
+            autocomplete.venues.put(venue.id, venue.name)
+            areas.venues.put(venue.id, venue.state, venue.city, venue.name)
+            recent.venues.put(venue.id, venue.name)
+            page_cache.invalidate('venues')
             flash(" Venue " + venue.name + "successfully edited!")
 
         except Exception:
@@ -445,6 +451,9 @@ def create_artist_submission():
             )
             db.session.add(created_artist)
             db.session.commit()
+            autocomplete.artists.put(created_artist.id, created_artist.name)
+            recent.artists.push(created_artist.id, created_artist.name)
+            page_cache.invalidate('artists')
             flash('Artist ' + request.form['name'] +
                   ' was successfully listed!')
 
@@ -464,19 +473,23 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@page_cache.cached('venues', 'artists', 'shows')
 def shows():
-    data = []
-    for i in Show.query.all():
-        data.append({
-            "venue_id": i.venue_id,
-            "venue_name": Venue.query.filter_by(id=i.venue_id).first().name,
-            "artist_id": i.artist_id,
-            "artist_name": Artist.query.filter_by(id=i.artist_id).first().name,
-            "artist_image_link": Artist.query.filter_by(id=i.artist_id).first().image_link,
-            "start_time": i.start_time.strftime("%m/%d/%Y, %H:%M:%S")
-        })
+    when = request.args.get('when')
+    if when not in (None, UPCOMING, PAST):
+        abort(400)
+    try:
+        # args.get(type=...) would turn a malformed value into None.
+        start, end = (datetime.fromisoformat(request.args[name]) if name in request.args
+                      else None for name in ('from', 'to'))
+    except ValueError:
+        abort(400)
+    after = cursor_arg((datetime, int))
 
-    return render_template('pages/shows.html', shows=data)
+    data, next_after = shows_feed(when=when, start=start, end=end, after=after,
+                                  limit=app.config['SHOWS_PAGE_SIZE'])
+    return render_template('pages/shows.html', shows=data, when=when,
+                           next_url=next_page_url('shows', next_after))
 
 
 @app.route('/shows/create')
@@ -490,58 +503,86 @@ def create_shows():
 def create_show_submission():
     form = ShowForm(request.form)
 
-    if form.validate():
-        new_show = Show(
-            venue_id=request.form['venue_id'],
-            artist_id=request.form['artist_id'],
-            start_time=request.form['start_time'],
-        )
-
-        try:
-            db.session.add(new_show)
-            db.session.commit()
-            flash('Show ' + {new_show.name} + ' was successfully listed!')
+    if not form.validate():
+        for field, errors in form.errors.items():
+            flash('{}: {}'.format(field.replace('_', ' ').capitalize(), ' '.join(errors)))
+        return render_template('forms/new_show.html', form=form), 400
+
+    venue_id, artist_id = int(form.venue_id.data), int(form.artist_id.data)
+    start_time = form.start_time.data
+    end_time = start_time + timedelta(minutes=form.duration.data)
+    new_show = Show(
+        venue_id=venue_id,
+        artist_id=artist_id,
+        start_time=start_time,
+        end_time=end_time,
+    )
 
-        except Exception as e:
+    try:
+        clashes = booking_conflicts(venue_id, artist_id, start_time, end_time)
+        if clashes:
             db.session.rollback()
-            print(sys.exc_info())
-            flash(f'An error occurred. Show couldn\'t be created')
-        finally:
-            db.session.close()
+            for clash in clashes:
+                flash('The {} is already booked {:%Y-%m-%d %H:%M} to {:%H:%M} (show {}).'.format(
+                    clash['clash'], clash['start_time'], clash['end_time'], clash['id']))
+            return render_template('forms/new_show.html', form=form), 409
+        db.session.add(new_show)
+        db.session.commit()
+        page_cache.invalidate('shows')
+        flash('Show was successfully listed!')
+
+    except UnknownOwner as e:
+        db.session.rollback()
+        flash(f'{e.kind.capitalize()} id: No {e.kind} {e.id}.')
+        return render_template('forms/new_show.html', form=form), 400
+    except Exception as e:
+        db.session.rollback()
+        print(sys.exc_info())
+        flash(f'An error occurred. Show couldn\'t be created')
+    finally:
+        db.session.close()
 
     return render_template('pages/home.html')
 
 
 @app.errorhandler(404)
+@api.json_errors
 def not_found_error(error):
     return render_template('errors/404.html'), 404
     
 
 @app.errorhandler(500)
+@api.json_errors
 def server_error(error):
     return render_template('errors/500.html'), 500
 
 @app.errorhandler(400)
+@api.json_errors
 def bad_request(error):
     return render_template('errors/400.html'), 400
 
 @app.errorhandler(401)
+@api.json_errors
 def unauthorized(error):
     return render_template('errors/401.html'), 401
 
 @app.errorhandler(403)
+@api.json_errors
 def forbidden(error):
     return render_template('errors/403.html'), 403
 
 @app.errorhandler(422)
+@api.json_errors
 def not_processable(error):
     return render_template('errors/422.html'), 422
 
 @app.errorhandler(405)
+@api.json_errors
 def invalid_method(error):
     return render_template('errors/405.html'), 405
 
 @app.errorhandler(409)
+@api.json_errors
 def duplicate_resource(error):
     return render_template('errors/409.html'), 409
 
@@ -0,0 +1,151 @@
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from flask import current_app, jsonify
+
+from models import db, Venue
+
+#----------------------------------------------------------------------------#
+# Area index.
+#
+# Each process keeps venues as state -> city -> sorted (name, id) list, so
+# /venues/<state> (cities and their venue counts) and /venues/<state>/<city>
+# (a page of venues) are answered without a query. Like autocomplete, the
+# index is loaded on first use and kept current by the create/edit/delete
+# handlers in app.py; writes from other processes (or bulk imports) show up
+# once it is older than AREA_INDEX_MAX_AGE seconds and reloads.
+#----------------------------------------------------------------------------#
+
+
+class AreaIndex:
+
+    def __init__(self):
+        self.loaded_at = None
+        self.max_age = None
+        self.memory_bytes = 0
+        self._states = {}
+        self._venues = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        started = time.perf_counter()
+        states, venues = {}, {}
+        rows = db.session.query(Venue.id, Venue.state, Venue.city, Venue.name) \
+            .execution_options(yield_per=10000)
+        for id, state, city, name in rows:
+            state, city = _intern(state), _intern(city)
+            venues[id] = (state, city, name or '')
+            states.setdefault(state, {}).setdefault(city, []).append((name or '', id))
+        for cities in states.values():
+            for entries in cities.values():
+                entries.sort()
+        # Measured before the index is shared, so stats never walk it under the lock.
+        memory_bytes = memory_usage(states, venues)
+        with self._lock:
+            self._states, self._venues = states, venues
+            self.memory_bytes = memory_bytes
+            self.loaded_at = time.monotonic()
+        current_app.logger.info(
+            'areas: loaded %d venues in %d states in %.0f ms', len(venues), len(states),
+            (time.perf_counter() - started) * 1000)
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or (
+                self.max_age and time.monotonic() - self.loaded_at > self.max_age):
+            self.load()
+
+    def _remove(self, id):
+        place = self._venues.pop(id, None)
+        if place is None:
+            return
+        state, city, name = place
+        cities = self._states[state]
+        entries = cities[city]
+        del entries[bisect_left(entries, (name, id))]
+        if not entries:
+            del cities[city]
+            if not cities:
+                del self._states[state]
+
+    def put(self, id, state, city, name):
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            self._remove(id)
+            state, city = _intern(state), _intern(city)
+            self._venues[id] = (state, city, name or '')
+            insort(self._states.setdefault(state, {}).setdefault(city, []), (name or '', id))
+
+    def remove(self, id):
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            self._remove(id)
+
+    def cities(self, state):
+        """``[{'city', 'venues'}]`` for ``state`` by city name; empty if it has none."""
+        with self._lock:
+            cities = self._states.get(state, {})
+            return [{'city': city, 'venues': len(entries)}
+                    for city, entries in sorted(cities.items(), key=lambda item: item[0] or '')]
+
+    def venues(self, state, city, after=None, limit=100):
+        """One page of ``{'id', 'name'}`` in a city, keyed on (name, id) like keyset_page.
+
+        Returns ``(venues, next_after)``, or ``(None, None)`` for an unknown city.
+        """
+        with self._lock:
+            entries = self._states.get(state, {}).get(city)
+            if entries is None:
+                return None, None
+            start = bisect_right(entries, tuple(after)) if after is not None else 0
+            page = entries[start:start + limit + 1]
+        next_after = page[limit - 1] if len(page) > limit else None
+        return [{'id': id, 'name': name} for name, id in page[:limit]], next_after
+
+    def stats(self):
+        loaded = self.loaded_at is not None
+        return {
+            'loaded': loaded,
+            'age_seconds': round(time.monotonic() - self.loaded_at, 1) if loaded else None,
+            'states': len(self._states),
+            'venues': len(self._venues),
+            # As of the last load.
+            'memory_bytes': self.memory_bytes,
+        }
+
+
+def memory_usage(states, venues):
+    """Approximate bytes held by an index (lists, entry tuples and names)."""
+    total = sys.getsizeof(states) + sys.getsizeof(venues)
+    for cities in states.values():
+        total += sys.getsizeof(cities)
+        for entries in cities.values():
+            total += sys.getsizeof(entries)
+    for id, place in venues.items():
+        # The name is shared by the place and the (name, id) entry.
+        total += sys.getsizeof(id) + sys.getsizeof(place) + \
+            sys.getsizeof(place[2]) + sys.getsizeof((place[2], id))
+    return total
+
+
+def _intern(value):
+    # Thousands of venues share each state and city string.
+    return sys.intern(value) if value is not None else None
+
+
+venues = AreaIndex()
+
+
+def init_app(app):
+    app.config.setdefault('AREA_INDEX_MAX_AGE', 600)
+    app.config.setdefault('STATS_ENDPOINTS', app.debug)
+    venues.max_age = app.config['AREA_INDEX_MAX_AGE']
+
+    def area_stats():
+        return jsonify(venues.stats())
+
+    if app.config['STATS_ENDPOINTS']:
+        app.add_url_rule('/areas/stats', view_func=area_stats)
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+
+import click
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # .br variants are skipped; browsers fall back to .gz
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:  # the bundled libraries are already minified
+    rjsmin = None
+
+#----------------------------------------------------------------------------#
+# Static asset bundles.
+#
+# ``flask assets build`` concatenates each bundle's sources, minifies the
+# result, writes it under static/dist with a content hash in the name and
+# next to it .gz (and .br, with the brotli package) copies, then records the
+# mapping in static/dist/manifest.json. Templates call ``asset_urls(bundle)``:
+# with a manifest that is the one hashed file, served below with the best
+# precompressed variant the client accepts and a year-long immutable cache
+# lifetime; without one (a fresh checkout) it is the individual sources.
+#----------------------------------------------------------------------------#
+
+BUNDLES = {
+    'app.css': [
+        'css/bootstrap.min.css',
+        'css/layout.main.css',
+        'css/main.css',
+        'css/main.responsive.css',
+        'css/main.quickfix.css',
+    ],
+    'head.js': [
+        'js/libs/modernizr-2.8.2.min.js',
+        'js/libs/moment.min.js',
+    ],
+    # Deferred: runs after the jQuery <script> at the end of <body>.
+    'app.js': [
+        'js/libs/bootstrap-3.1.1.min.js',
+        'js/plugins.js',
+        'js/script.js',
+    ],
+}
+
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+_css_tokens = re.compile(r'(/\*.*?\*/)|("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', re.S)
+
+
+def minify_css(source):
+    """Drop comments (but not /*! licences) and redundant whitespace; strings are kept."""
+    out = []
+    code = ''
+    position = 0
+    for match in _css_tokens.finditer(source):
+        code += source[position:match.start()]
+        position = match.end()
+        if match.group(2) or match.group(1).startswith('/*!'):
+            out.append(_squeeze_css(code))
+            out.append(match.group(0))
+            code = ''
+    out.append(_squeeze_css(code + source[position:]))
+    return ''.join(out).replace(';}', '}').strip()
+
+
+def _squeeze_css(text):
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r' ?([{};,>]) ?', r'\1', text)
+    # Only after ':' -- "a :hover" and "a:hover" are different selectors.
+    return text.replace(': ', ':')
+
+
+def minify_js(source):
+    return rjsmin.jsmin(source) if rjsmin is not None else source
+
+
+def read_bundle(static_folder, sources):
+    parts = []
+    for source in sources:
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            parts.append(f.read())
+    # A file ending in a comment or without a trailing ';' must not run into the next.
+    return '\n;\n'.join(parts) if sources[0].endswith('.js') else '\n'.join(parts)
+
+
+def build(static_folder):
+    """Write every bundle and its compressed variants; returns the manifest."""
+    dist = os.path.join(static_folder, DIST)
+    os.makedirs(dist, exist_ok=True)
+    manifest = {}
+    for bundle, sources in BUNDLES.items():
+        text = read_bundle(static_folder, sources)
+        text = minify_css(text) if bundle.endswith('.css') else minify_js(text)
+        data = text.encode('utf-8')
+        stem, ext = os.path.splitext(bundle)
+        name = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        path = os.path.join(dist, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, 9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+        manifest[bundle] = f'{DIST}/{name}'
+    with open(os.path.join(dist, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def init_app(app):
+    manifest = load_manifest(app.static_folder)
+
+    @app.template_global()
+    def asset_urls(bundle):
+        if bundle in manifest:
+            return [url_for('static', filename=manifest[bundle])]
+        return [url_for('static', filename=source) for source in BUNDLES[bundle]]
+
+    # More specific than Flask's /static/<path:filename>, so it wins for dist/.
+    @app.route(f'/static/{DIST}/<path:filename>')
+    def static_bundle(filename):
+        directory = os.path.join(app.static_folder, DIST)
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in ENCODINGS:
+            if encoding in request.accept_encodings and \
+                    os.path.exists(os.path.join(directory, filename + suffix)):
+                response = send_from_directory(directory, filename + suffix,
+                                               mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(directory, filename, mimetype=mimetype)
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @app.cli.group('assets')
+    def assets_command():
+        """Static asset bundles."""
+
+    @assets_command.command('build')
+    def build_command():
+        """Bundle, minify, fingerprint and precompress the CSS and JS."""
+        manifest.clear()
+        manifest.update(build(app.static_folder))
+        for bundle, path in sorted(manifest.items()):
+            size = os.path.getsize(os.path.join(app.static_folder, path))
+            gz = os.path.getsize(os.path.join(app.static_folder, path + '.gz'))
+            click.echo(f'{bundle:8} -> {path}  {size} bytes, {gz} gzipped')
@@ -0,0 +1,165 @@
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+
+from flask import jsonify, request, current_app
+
+from models import db, Artist, Venue
+
+#----------------------------------------------------------------------------#
+# Autocomplete.
+#
+# Each process keeps a sorted array of (folded suffix, id) keys per entity,
+# one key for every word start in a name, so "blue" completes both
+# "Blue Moon" and "The Blue Note". A lookup is a bisect plus a short scan.
+# The arrays are loaded from the database on first use and kept current by
+# the create/edit/delete handlers in app.py; edits made by other processes
+# (or bulk imports) show up once an index is older than AUTOCOMPLETE_MAX_AGE
+# seconds and reloads.
+#----------------------------------------------------------------------------#
+
+
+def fold(name):
+    return ' '.join((name or '').casefold().split())
+
+
+def word_suffixes(name):
+    folded = fold(name)
+    start = 0
+    while start < len(folded):
+        yield folded[start:]
+        space = folded.find(' ', start)
+        if space < 0:
+            break
+        start = space + 1
+
+
+class PrefixIndex:
+
+    def __init__(self, model):
+        self.model = model
+        self.loaded_at = None
+        self.max_age = None
+        self.memory_bytes = 0
+        self._keys = []
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        started = time.perf_counter()
+        keys, names = [], {}
+        rows = db.session.query(self.model.id, self.model.name) \
+            .execution_options(yield_per=10000)
+        for id, name in rows:
+            names[id] = name
+            keys.extend((suffix, id) for suffix in word_suffixes(name))
+        keys.sort()
+        # Measured here, before the arrays are shared, so stats never walk
+        # them under the lock.
+        memory_bytes = memory_usage(keys, names)
+        with self._lock:
+            self._keys, self._names = keys, names
+            self.memory_bytes = memory_bytes
+            self.loaded_at = time.monotonic()
+        current_app.logger.info(
+            'autocomplete: loaded %d %s names (%d keys, %.1f MiB) in %.0f ms',
+            len(names), self.model.__tablename__, len(keys), memory_bytes / 2 ** 20,
+            (time.perf_counter() - started) * 1000)
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or (
+                self.max_age and time.monotonic() - self.loaded_at > self.max_age):
+            self.load()
+
+    def _remove_keys(self, id):
+        name = self._names.pop(id, None)
+        if name is None:
+            return
+        for suffix in word_suffixes(name):
+            position = bisect_left(self._keys, (suffix, id))
+            if position < len(self._keys) and self._keys[position] == (suffix, id):
+                del self._keys[position]
+
+    def put(self, id, name):
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            self._remove_keys(id)
+            self._names[id] = name
+            for suffix in word_suffixes(name):
+                insort(self._keys, (suffix, id))
+
+    def remove(self, id):
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            self._remove_keys(id)
+
+    def complete(self, prefix, limit=10):
+        prefix = fold(prefix)
+        if not prefix:
+            return []
+        found = {}
+        with self._lock:
+            position = bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and len(found) < limit:
+                suffix, id = self._keys[position]
+                if not suffix.startswith(prefix):
+                    break
+                found.setdefault(id, self._names[id])
+                position += 1
+        return [{'id': id, 'name': name} for id, name in found.items()]
+
+    def stats(self):
+        loaded = self.loaded_at is not None
+        return {
+            'loaded': loaded,
+            'age_seconds': round(time.monotonic() - self.loaded_at, 1) if loaded else None,
+            'names': len(self._names),
+            'keys': len(self._keys),
+            # As of the last load.
+            'memory_bytes': self.memory_bytes,
+        }
+
+
+def memory_usage(keys, names):
+    """Approximate bytes held by an index's keys, key tuples and names."""
+    total = sys.getsizeof(keys) + sys.getsizeof(names)
+    for suffix, id in keys:
+        total += sys.getsizeof((suffix, id)) + sys.getsizeof(suffix)
+    for id, name in names.items():
+        total += sys.getsizeof(id) + sys.getsizeof(name)
+    return total
+
+
+venues = PrefixIndex(Venue)
+artists = PrefixIndex(Artist)
+INDEXES = {'venues': venues, 'artists': artists}
+
+
+def init_app(app):
+    app.config.setdefault('AUTOCOMPLETE_MAX_AGE', 600)
+    app.config.setdefault('STATS_ENDPOINTS', app.debug)
+    for index in INDEXES.values():
+        index.max_age = app.config['AUTOCOMPLETE_MAX_AGE']
+
+    @app.route('/autocomplete')
+    def autocomplete():
+        prefix = request.args.get('q', '')
+        kinds = request.args.get('type', 'venues,artists').split(',')
+        limit = min(request.args.get('limit', 10, type=int), 50)
+        response = {}
+        for kind in kinds:
+            index = INDEXES.get(kind)
+            if index is None:
+                return jsonify({'error': f'unknown type {kind!r}'}), 400
+            index.ensure_loaded()
+            response[kind] = index.complete(prefix, limit)
+        return jsonify(response)
+
+    def autocomplete_stats():
+        return jsonify({kind: index.stats() for kind, index in INDEXES.items()})
+
+    if app.config['STATS_ENDPOINTS']:
+        app.add_url_rule('/autocomplete/stats', view_func=autocomplete_stats)
@@ -0,0 +1,299 @@
+"""Route-level benchmarks for fyyur.
+
+Drives every page through the Flask test client against the configured
+database (seed it first with ``flask seed``) and reports latency
+percentiles, sequential throughput, queries per request and peak traced
+memory per route, then sets each /api/v1 route beside the HTML page serving
+the same data (payload bytes and median latency). ``--templates`` instead
+times rendering the show-heavy templates alone, with synthetic context and
+no database. Results are written as JSON so runs on different commits can
+be compared.
+
+    python benchmark.py --requests 200 --output bench-$(git rev-parse --short HEAD).json
+    python benchmark.py --templates --shows 500
+    python benchmark.py --compare bench-old.json bench-new.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+
+from flask import render_template
+
+from app import app
+from cache import page_cache
+from models import db, Artist, Venue, Show
+from sqlprofile import count_queries
+
+SEARCH_TERMS = ['blue', 'new york', 'jazz', 'hall', 'wolves', 'san francisco, ca']
+
+
+def routes(venue_id, artist_id, state, city):
+    """(name, method, path, form data) for each benchmarked route."""
+    week = 'from={}&to={}'.format(date.today(), date.today() + timedelta(days=7))
+    year = 'from={}&to={}'.format(date.today(), date.today() + timedelta(days=365))
+    area = '/venues/' + quote(state or '', safe='')
+    return [
+        ('index', 'GET', '/', None),
+        ('venues', 'GET', '/venues', None),
+        ('venues_in_state', 'GET', area, None),
+        ('venues_in_city', 'GET', area + '/' + quote(city or '', safe=''), None),
+        ('artists', 'GET', '/artists', None),
+        ('shows', 'GET', '/shows', None),
+        ('shows_upcoming', 'GET', '/shows?when=upcoming', None),
+        ('shows_past', 'GET', '/shows?when=past', None),
+        ('show_venue', 'GET', f'/venues/{venue_id}', None),
+        ('show_artist', 'GET', f'/artists/{artist_id}', None),
+        ('search_venues', 'POST', '/venues/search', {'search_term': SEARCH_TERMS}),
+        ('search_artists', 'POST', '/artists/search', {'search_term': SEARCH_TERMS}),
+        ('autocomplete', 'GET', '/autocomplete?q=bl', None),
+        ('create_venue_form', 'GET', '/venues/create', None),
+        ('create_artist_form', 'GET', '/artists/create', None),
+        ('create_show_form', 'GET', '/shows/create', None),
+        ('api_venues', 'GET', '/api/v1/venues', None),
+        ('api_artists', 'GET', '/api/v1/artists', None),
+        ('api_shows', 'GET', '/api/v1/shows', None),
+        ('api_venue', 'GET', f'/api/v1/venues/{venue_id}', None),
+        ('api_artist', 'GET', f'/api/v1/artists/{artist_id}', None),
+        ('api_search_venues', 'GET', '/api/v1/venues/search', {'q': SEARCH_TERMS}),
+        ('api_search_artists', 'GET', '/api/v1/artists/search', {'q': SEARCH_TERMS}),
+        ('api_genres', 'GET', '/api/v1/genres', None),
+        ('api_calendar', 'GET', f'/api/v1/calendar?{week}', None),
+        ('api_calendar_buckets', 'GET', f'/api/v1/calendar/buckets?{year}&by=week', None),
+        ('export_venues', 'GET', '/export/venues.csv', None),
+        ('export_shows', 'GET', '/export/shows.ndjson.gz', None),
+    ]
+
+
+# Each JSON API route and the HTML page serving the same data.
+API_PAIRS = [
+    ('api_venues', 'venues'), ('api_artists', 'artists'), ('api_shows', 'shows'),
+    ('api_venue', 'show_venue'), ('api_artist', 'show_artist'),
+    ('api_search_venues', 'search_venues'), ('api_search_artists', 'search_artists'),
+]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def request_once(client, method, path, data, n):
+    if data is not None:
+        data = {key: values[n % len(values)] for key, values in data.items()}
+    if method == 'GET' and data is not None:
+        response = client.open(path, method=method, query_string=data)
+    else:
+        response = client.open(path, method=method, data=data)
+    # Streamed responses (calendar, export) do their work as they are read.
+    response.get_data()
+    return response
+
+
+def bench_route(client, method, path, data, requests, warmup):
+    for n in range(warmup):
+        request_once(client, method, path, data, n)
+
+    latencies, queries = [], []
+    started = time.perf_counter()
+    for n in range(requests):
+        with count_queries() as log:
+            t = time.perf_counter()
+            response = request_once(client, method, path, data, n)
+            latencies.append(time.perf_counter() - t)
+        queries.append(log.count)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    request_once(client, method, path, data, 0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'bytes': len(response.get_data()),
+        'requests': requests,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+        'throughput_rps': round(requests / elapsed, 1),
+        'queries_avg': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(requests, warmup, only=None, use_cache=False):
+    app.config['WTF_CSRF_ENABLED'] = False
+    if not use_cache:
+        page_cache.backend = None
+    client = app.test_client()
+    with app.app_context():
+        venue_id, state, city = db.session.query(Venue.id, Venue.state, Venue.city) \
+            .order_by(Venue.id).limit(1).first() or (None, None, None)
+        artist_id = db.session.query(Artist.id).order_by(Artist.id).limit(1).scalar()
+        results = {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'database': db.engine.dialect.name,
+            'python': platform.python_version(),
+            'page_cache': use_cache,
+            'rows': {
+                'venues': db.session.query(Venue).count(),
+                'artists': db.session.query(Artist).count(),
+                'shows': db.session.query(Show).count(),
+            },
+            'routes': {},
+        }
+    for name, method, path, data in routes(venue_id or 1, artist_id or 1, state, city):
+        if only and name not in only:
+            continue
+        result = bench_route(client, method, path, data, requests, warmup)
+        results['routes'][name] = result
+        print(f'{name:20} {result["status"]} p50 {result["p50_ms"]:8.2f} ms  '
+              f'p95 {result["p95_ms"]:8.2f} ms  p99 {result["p99_ms"]:8.2f} ms  '
+              f'{result["throughput_rps"]:8.1f} req/s  {result["queries_avg"]:5.1f} q  '
+              f'{result["peak_memory_kib"]:9.1f} KiB', file=sys.stderr)
+    report_api_pairs(results['routes'])
+    return results
+
+
+def report_api_pairs(routes):
+    for api_route, html_route in API_PAIRS:
+        if api_route not in routes or html_route not in routes:
+            continue
+        api, html = routes[api_route], routes[html_route]
+        print(f'{api_route:20} vs {html_route:15} bytes {api["bytes"]:>8} / {html["bytes"]:>8}  '
+              f'p50 {api["p50_ms"]:7.2f} / {html["p50_ms"]:7.2f} ms', file=sys.stderr)
+
+
+def sample_shows(count, prefix, now):
+    return [{
+        'id': n,
+        f'{prefix}_id': n,
+        f'{prefix}_name': f'{prefix.title()} {n}',
+        f'{prefix}_image_link': f'https://images.example.com/{prefix}s/{n}.jpg',
+        'start_time': now + timedelta(hours=n),
+    } for n in range(count)]
+
+
+def template_cases(shows):
+    """(template, context) pairs with ``shows`` shows in each list."""
+    now = datetime.now()
+    entity = {
+        'id': 1, 'name': 'The Blue Room', 'genres': ['Jazz', 'Blues'],
+        'city': 'New York', 'state': 'NY', 'address': '1 Main St',
+        'phone': '212-555-0100', 'website': 'https://example.com',
+        'facebook_link': 'https://www.facebook.com/example',
+        'seeking_talent': True, 'seeking_venue': True,
+        'seeking_description': 'Looking for local acts on weekends.',
+        'image_link': 'https://images.example.com/1.jpg',
+        'past_shows_count': shows, 'upcoming_shows_count': shows,
+    }
+    feed = [dict(show, **venue) for show, venue in
+            zip(sample_shows(shows, 'artist', now), sample_shows(shows, 'venue', now))]
+    artist_shows = sample_shows(shows, 'artist', now)
+    venue_shows = sample_shows(shows, 'venue', now)
+    return [
+        ('pages/shows.html', {'shows': feed, 'next_url': None}),
+        ('pages/show_venue.html', {'venue': dict(
+            entity, past_shows=artist_shows, upcoming_shows=artist_shows)}),
+        ('pages/show_artist.html', {'artist': dict(
+            entity, past_shows=venue_shows, upcoming_shows=venue_shows)}),
+    ]
+
+
+def bench_templates(iterations, shows):
+    results = {}
+    with app.test_request_context():
+        for template, context in template_cases(shows):
+            html = render_template(template, **context)
+            latencies = []
+            for _ in range(iterations):
+                t = time.perf_counter()
+                render_template(template, **context)
+                latencies.append(time.perf_counter() - t)
+            results[template] = {
+                'shows': shows,
+                'bytes': len(html),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            }
+            print(f'{template:25} p50 {results[template]["p50_ms"]:8.2f} ms  '
+                  f'p95 {results[template]["p95_ms"]:8.2f} ms  '
+                  f'p99 {results[template]["p99_ms"]:8.2f} ms', file=sys.stderr)
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'templates': results,
+    }
+
+
+def compare(old, new):
+    print(f'{"route":20} {"p50 ms":>18} {"p95 ms":>18} {"queries":>12} {"peak KiB":>20}')
+    for name, after in new.get('routes', {}).items():
+        before = old.get('routes', {}).get(name)
+        if before is None:
+            continue
+
+        def cell(key, width):
+            a, b = before[key], after[key]
+            change = f'{(b - a) / a * 100:+.0f}%' if a else ''
+            return f'{a:g}->{b:g} {change}'.rjust(width)
+        print(f'{name:20} {cell("p50_ms", 18)} {cell("p95_ms", 18)} '
+              f'{cell("queries_avg", 12)} {cell("peak_memory_kib", 20)}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100,
+                        help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--route', action='append',
+                        help='only benchmark this route (repeatable)')
+    parser.add_argument('--with-cache', action='store_true',
+                        help='leave the page cache on (measures cache hits)')
+    parser.add_argument('--templates', action='store_true',
+                        help='time template rendering only (no database)')
+    parser.add_argument('--shows', type=int, default=200,
+                        help='shows per list for --templates')
+    parser.add_argument('--output', help='write results JSON here')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two results files and exit')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            compare(json.load(old), json.load(new))
+        return 0
+
+    if args.templates:
+        results = bench_templates(args.requests, args.shows)
+    else:
+        results = run(args.requests, args.warmup, args.route, args.with_cache)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,51 @@
+from datetime import datetime
+from itertools import groupby
+
+from counters import show_counts
+from genres import has_genre
+from models import db, Artist, Venue
+from pagination import keyset_page
+
+#----------------------------------------------------------------------------#
+# Area browse.
+#----------------------------------------------------------------------------#
+
+
+AREA_KEYS = (Venue.state, Venue.city, Venue.name, Venue.id)
+
+
+def venue_areas(after=None, limit=100, now=None, genre=None):
+    """Group one page of venues into (city, state) areas with upcoming show counts.
+
+    One statement over venues alone: the counts are the stored counters (see
+    counters.py), so no shows are read unless a venue's next show has
+    started since the last rollover. ``genre`` keeps the venues playing it.
+    Pages are keyed on (state, city, name, id); returns ``(areas, next_after)``.
+    """
+    num_upcoming_shows, _ = show_counts(Venue, now or datetime.now())
+    query = db.session.query(Venue.city, Venue.state, Venue.id, Venue.name,
+                             num_upcoming_shows)
+    if genre:
+        query = query.filter(has_genre(Venue, genre))
+    rows, next_after = keyset_page(query, AREA_KEYS, after=after, limit=limit)
+
+    areas = []
+    for (city, state), venues in groupby(rows, key=lambda row: (row[0], row[1])):
+        areas.append({
+            'city': city if city is not None else 'venue city',
+            'state': state if state is not None else 'venue state',
+            'venues': [{
+                'id': venue_id,
+                'name': name,
+                'num_upcoming_shows': count,
+            } for _, _, venue_id, name, count in venues],
+        })
+    return areas, next_after
+
+
+def artist_listing(after=None, limit=100, genre=None):
+    """One page of (id, name) rows ordered by name; returns ``(rows, next_after)``."""
+    query = db.session.query(Artist.id, Artist.name)
+    if genre:
+        query = query.filter(has_genre(Artist, genre))
+    return keyset_page(query, (Artist.name, Artist.id), after=after, limit=limit)
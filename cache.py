@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, jsonify, make_response, request, session
+
+from replicas import reads_primary
+
+#----------------------------------------------------------------------------#
+# Page cache.
+#
+# Rendered pages are cached per path (query string included) and tagged
+# with the tables they read. Each tag has a generation number that is part
+# of the cache key; a write bumps the generation of the tags it touches, so
+# every page built from the old data stops matching at once and ages out of
+# the backend through LRU/TTL. Because the generations live in the backend,
+# a shared backend (Redis) invalidates across worker processes too.
+#----------------------------------------------------------------------------#
+
+
+class MemoryBackend:
+    """In-process LRU with per-entry TTL and entry/byte limits."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 2 ** 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def generations(self, tags):
+        with self._lock:
+            return [self._counters.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._counters[tag] = self._counters.get(tag, 0) + 1
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'evictions': self.evictions,
+        }
+
+
+class RedisBackend:
+    """Any Redis-protocol server (redis, valkey, a local stand-in).
+
+    Size limits and LRU eviction are the server's ``maxmemory`` and
+    ``maxmemory-policy allkeys-lru`` settings.
+    """
+
+    def __init__(self, url, prefix='fyyur:page:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.errors = redis.exceptions.ResponseError
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def generations(self, tags):
+        values = self.client.mget([f'{self.prefix}gen:{tag}' for tag in tags])
+        return [int(value or 0) for value in values]
+
+    def bump(self, tags):
+        pipeline = self.client.pipeline()
+        for tag in tags:
+            pipeline.incr(f'{self.prefix}gen:{tag}')
+        pipeline.execute()
+
+    def stats(self):
+        try:
+            info = self.client.info()
+        except self.errors:
+            info = {}  # stand-ins that do not implement INFO
+        return {
+            'entries': self.client.dbsize(),
+            'bytes': info.get('used_memory'),
+            'evictions': info.get('evicted_keys'),
+        }
+
+
+class PageCache:
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_BACKEND', 'memory')
+        app.config.setdefault('PAGE_CACHE_TTL', 60)
+        app.config.setdefault('PAGE_CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('PAGE_CACHE_MAX_BYTES', 64 * 2 ** 20)
+        app.config.setdefault('PAGE_CACHE_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('STATS_ENDPOINTS', app.debug)
+
+        backend = app.config['PAGE_CACHE_BACKEND']
+        if backend == 'memory':
+            self.backend = MemoryBackend(app.config['PAGE_CACHE_MAX_ENTRIES'],
+                                         app.config['PAGE_CACHE_MAX_BYTES'])
+        elif backend == 'redis':
+            self.backend = RedisBackend(app.config['PAGE_CACHE_URL'])
+        elif backend is None:
+            self.backend = None
+        else:
+            raise ValueError(f'unknown PAGE_CACHE_BACKEND {backend!r}')
+        self.ttl = app.config['PAGE_CACHE_TTL']
+
+        def page_cache_stats():
+            return jsonify(self.stats())
+
+        if app.config['STATS_ENDPOINTS']:
+            app.add_url_rule('/cache/stats', view_func=page_cache_stats)
+
+    def cached(self, *tags):
+        """Cache a GET view's 200 responses until ``tags`` are invalidated."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Pages carrying flashed messages are per-user; never share them.
+                # A client that just wrote reads the primary (see replicas.py)
+                # and must not be handed a page rendered from a lagging
+                # replica, nor leave its page for clients that read one.
+                if self.backend is None or request.method != 'GET' \
+                        or session.get('_flashes') or reads_primary():
+                    return view(*args, **kwargs)
+
+                generations = self.backend.generations(tags)
+                key = '{}|{}'.format(request.full_path, '.'.join(map(str, generations)))
+                body = self.backend.get(key)
+                if body is not None:
+                    self.hits += 1
+                    return Response(body, mimetype='text/html')
+
+                self.misses += 1
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough \
+                        and not g.get('db_wrote'):
+                    self.backend.set(key, response.get_data(), self.ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        if self.backend is not None:
+            self.backend.bump(tags)
+            self.invalidations += 1
+
+    def stats(self):
+        stats = {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+        }
+        if self.backend is not None:
+            stats.update(self.backend.stats())
+        return stats
+
+
+page_cache = PageCache()
@@ -0,0 +1,142 @@
+import csv
+
+import click
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import aliased
+
+from models import db, Artist, Venue, Show, SHOW_MAX_DURATION
+
+#----------------------------------------------------------------------------#
+# Booking conflicts.
+#
+# Two shows conflict when they share a venue (or an artist) and their
+# [start_time, end_time) intervals overlap.
+#
+#   postgresql  GiST indexes on (venue_id, tsrange(start_time, end_time)) and
+#               the same for artist_id (needs btree_gist); checks use &&.
+#   others      the (venue_id, start_time) and (artist_id, start_time)
+#               B-tree indexes: a show overlapping [start, end) starts before
+#               end and, as no show runs longer than SHOW_MAX_DURATION, after
+#               start - SHOW_MAX_DURATION -- a bounded range scan.
+#
+# ``booking_conflicts`` checks one new or moved show. It locks the venue and
+# artist rows first, so two bookings for the same venue or artist are
+# checked one after the other rather than both passing, and a venue or
+# artist that does not exist raises UnknownOwner (SQLite does not enforce
+# the foreign keys).
+#
+# ``conflict_pairs`` finds every conflicting pair: of two overlapping shows
+# one starts within the other, so each show is joined to the shows of the
+# same venue (or artist) starting in [start_time, end_time) -- a range scan
+# of the same B-tree index per show, in batches of venue (or artist) ids.
+#
+#   flask shows conflicts --by venue --from 2026-01-01 -o conflicts.csv
+#----------------------------------------------------------------------------#
+
+OWNERS = {'venue': (Venue, 'venue_id'), 'artist': (Artist, 'artist_id')}
+
+
+class UnknownOwner(LookupError):
+
+    def __init__(self, kind, id):
+        super().__init__(f'no {kind} {id}')
+        self.kind = kind
+        self.id = id
+
+
+def _overlapping(start, end):
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.tsrange(Show.start_time, Show.end_time).op('&&')(func.tsrange(start, end))
+    return and_(Show.start_time < end, Show.start_time > start - SHOW_MAX_DURATION,
+                Show.end_time > start)
+
+
+def booking_conflicts(venue_id, artist_id, start, end, exclude_id=None, limit=10):
+    """Shows that overlap [start, end) at the venue or by the artist, earliest first.
+
+    Locks the venue and artist rows until the transaction ends; call it in
+    the transaction that writes the show. Raises UnknownOwner if either is
+    missing.
+    """
+    for kind, owner_id in (('venue', venue_id), ('artist', artist_id)):
+        model = OWNERS[kind][0]
+        found = db.session.execute(
+            select(model.id).where(model.id == owner_id).with_for_update()).scalar()
+        if found is None:
+            raise UnknownOwner(kind, owner_id)
+    overlapping = _overlapping(start, end)
+    query = (
+        select(Show.id, Show.venue_id, Show.artist_id, Show.start_time, Show.end_time)
+        .where(or_(and_(Show.venue_id == venue_id, overlapping),
+                   and_(Show.artist_id == artist_id, overlapping)))
+        .order_by(Show.start_time, Show.id)
+        .limit(limit)
+    )
+    if exclude_id is not None:
+        query = query.where(Show.id != exclude_id)
+    return [{
+        'id': row.id,
+        'venue_id': row.venue_id,
+        'artist_id': row.artist_id,
+        'start_time': row.start_time,
+        'end_time': row.end_time,
+        'clash': 'venue' if row.venue_id == venue_id else 'artist',
+    } for row in db.session.execute(query)]
+
+
+def conflict_pairs(by='venue', start=None, end=None, batch_size=1000):
+    """Yield ``(owner_id, show, other)`` for every overlapping pair of shows.
+
+    ``show`` and ``other`` are ``(id, start_time, end_time)`` rows, ``show``
+    starting first (or with the lower id). ``start``/``end`` narrow the pairs
+    to those whose first show starts in [start, end).
+    """
+    model, key = OWNERS[by]
+    first, second = aliased(Show), aliased(Show)
+    first_key, second_key = getattr(first, key), getattr(second, key)
+    last_id = db.session.query(func.max(model.id)).scalar() or 0
+    for low in range(0, last_id, batch_size):
+        query = (
+            select(first_key, first.id, first.start_time, first.end_time,
+                   second.id, second.start_time, second.end_time)
+            .join(second, and_(second_key == first_key,
+                               second.start_time >= first.start_time,
+                               second.start_time < first.end_time,
+                               or_(second.start_time > first.start_time,
+                                   second.id > first.id)))
+            .where(first_key > low, first_key <= low + batch_size)
+            .order_by(first_key, first.start_time, first.id, second.start_time, second.id)
+        )
+        if start is not None:
+            query = query.where(first.start_time >= start)
+        if end is not None:
+            query = query.where(first.start_time < end)
+        for row in db.session.execute(query):
+            yield row[0], row[1:4], row[4:7]
+
+
+def init_app(app):
+    @app.cli.group('shows')
+    def shows_command():
+        """Show bookings."""
+
+    @shows_command.command('conflicts')
+    @click.option('--by', type=click.Choice(sorted(OWNERS)), multiple=True,
+                  help='Venue or artist double-bookings (default: both).')
+    @click.option('--from', 'start', type=click.DateTime(), help='First show starts at or after.')
+    @click.option('--to', 'end', type=click.DateTime(), help='First show starts before.')
+    @click.option('--batch-size', default=1000, show_default=True,
+                  help='Venue or artist ids per query.')
+    @click.option('-o', '--output', type=click.File('w'), default='-',
+                  help='CSV file to write (default: stdout).')
+    def conflicts_command(by, start, end, batch_size, output):
+        """Report every pair of overlapping shows at a venue or by an artist."""
+        writer = csv.writer(output)
+        writer.writerow(['by', 'owner_id', 'show_id', 'start_time', 'end_time',
+                         'other_show_id', 'other_start_time', 'other_end_time'])
+        for kind in by or sorted(OWNERS):
+            found = 0
+            for owner_id, show, other in conflict_pairs(kind, start, end, batch_size):
+                writer.writerow([kind, owner_id, *show, *other])
+                found += 1
+            click.echo(f'{kind}: {found} conflicting pairs', err=True)
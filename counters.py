@@ -0,0 +1,113 @@
+from datetime import datetime
+
+import click
+from sqlalchemy import case, or_, select
+
+from models import db, SHOW_OWNERS, live_counters, refresh_counters
+
+#----------------------------------------------------------------------------#
+# Show counters: reading and upkeep.
+#
+# Listings read the stored counts through ``show_counts``, which only falls
+# back to counting shows for rows whose next show has already started. The
+# rollover job recounts exactly those rows so the fallback stays rare:
+#
+#   */5 * * * *  flask counters rollover
+#
+# ``flask counters check`` compares the stored counts of every up-to-date
+# row with a recount (``--fix`` recounts the ones that differ) and
+# ``flask counters rebuild`` recounts everything, e.g. after a bulk load.
+#----------------------------------------------------------------------------#
+
+OWNER_KEYS = dict(SHOW_OWNERS)
+
+
+def is_fresh(model, now):
+    return or_(model.next_show_time.is_(None), model.next_show_time > now)
+
+
+def show_counts(model, now=None):
+    """``(upcoming, past)`` column expressions for a venue or artist query."""
+    now = now or datetime.now()
+    live = live_counters(model, OWNER_KEYS[model], now)
+    fresh = is_fresh(model, now)
+    return (
+        case((fresh, model.upcoming_shows_count),
+             else_=live['upcoming_shows_count']).label('num_upcoming_shows'),
+        case((fresh, model.past_shows_count),
+             else_=live['past_shows_count']).label('num_past_shows'),
+    )
+
+
+def rollover(now=None):
+    """Recount every row whose next show has started; returns {table: rows}."""
+    now = now or datetime.now()
+    connection = db.session.connection()
+    done = {model.__tablename__: refresh_counters(connection, model, key, now=now,
+                                                  stale_only=True)
+            for model, key in SHOW_OWNERS}
+    db.session.commit()
+    return done
+
+
+def mismatches(model, now=None, limit=None):
+    """Ids of up-to-date rows whose stored counters differ from a recount."""
+    now = now or datetime.now()
+    live = live_counters(model, OWNER_KEYS[model], now)
+    query = (
+        select(model.id)
+        .where(is_fresh(model, now))
+        .where(or_(model.upcoming_shows_count != live['upcoming_shows_count'],
+                   model.past_shows_count != live['past_shows_count'],
+                   model.next_show_time.is_distinct_from(live['next_show_time'])))
+        .order_by(model.id)
+        .limit(limit)
+    )
+    return [id for id, in db.session.execute(query)]
+
+
+def rebuild(batch_size=10000, echo=click.echo):
+    """Recount every row, one committed id range at a time."""
+    for model, key in SHOW_OWNERS:
+        last_id = db.session.query(db.func.max(model.id)).scalar() or 0
+        for start in range(0, last_id, batch_size):
+            ids = select(model.id).where(model.id > start, model.id <= start + batch_size)
+            refresh_counters(db.session.connection(), model, key, ids=ids)
+            db.session.commit()
+        echo(f'{model.__tablename__}: recounted ids up to {last_id}')
+
+
+def init_app(app):
+    @app.cli.group('counters')
+    def counters_command():
+        """Stored upcoming/past show counts on venues and artists."""
+
+    @counters_command.command('rollover')
+    def rollover_command():
+        """Recount venues and artists whose next show has started."""
+        for table, rows in rollover().items():
+            click.echo(f'{table}: {rows} rolled over')
+
+    @counters_command.command('check')
+    @click.option('--fix', is_flag=True, help='Recount the rows that differ.')
+    def check_command(fix):
+        """Compare stored counts with a recount of the shows table."""
+        now = datetime.now()
+        found = False
+        for model, key in SHOW_OWNERS:
+            ids = mismatches(model, now)
+            shown = ', '.join(map(str, ids[:10])) + (', ...' if len(ids) > 10 else '')
+            click.echo(f'{model.__tablename__}: {len(ids)} out of date'
+                       + (f' (ids {shown})' if ids else ''))
+            if ids and fix:
+                refresh_counters(db.session.connection(), model, key, ids=ids, now=now)
+                db.session.commit()
+            found = found or bool(ids)
+        if found and not fix:
+            raise SystemExit(1)
+
+    @counters_command.command('rebuild')
+    @click.option('--batch-size', default=10000, show_default=True)
+    def rebuild_command(batch_size):
+        """Recount every venue and artist from the shows table."""
+        rebuild(batch_size)
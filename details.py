@@ -0,0 +1,156 @@
+from datetime import datetime
+
+from sqlalchemy import func, literal, select, union_all
+
+from counters import show_counts
+from models import db, Artist, Venue, Show, genre_names
+
+#----------------------------------------------------------------------------#
+# Detail pages.
+#
+# A venue or artist page is loaded in one round trip: the entity, with its
+# stored show counts (see counters.py), is outer-joined to the nearest
+# ``limit`` upcoming and the latest ``limit`` past shows -- two short index
+# range scans on (owner, start_time) -- and to the counterpart of each show.
+#----------------------------------------------------------------------------#
+
+
+def _nearest_shows(owner_key, entity_id, upcoming, limit, offset, now):
+    starts = Show.start_time > now if upcoming else Show.start_time <= now
+    order = (Show.start_time, Show.id) if upcoming else (Show.start_time.desc(), Show.id.desc())
+    page = (
+        select(Show.id, Show.venue_id, Show.artist_id, Show.start_time)
+        .where(getattr(Show, owner_key) == entity_id, starts)
+        .order_by(*order)
+        .offset(offset)
+        .limit(limit)
+        .subquery()
+    )
+    return select(page, literal(upcoming).label('upcoming'))
+
+
+def _load(model, owner_key, counterpart, counterpart_key, entity_id, limit,
+          offset, now):
+    now = now or datetime.now()
+    shown = union_all(
+        _nearest_shows(owner_key, entity_id, True, limit, offset, now),
+        _nearest_shows(owner_key, entity_id, False, limit, offset, now),
+    ).subquery()
+    num_upcoming_shows, num_past_shows = show_counts(model, now)
+    rows = (
+        db.session.query(model, num_upcoming_shows, num_past_shows,
+                         shown.c.start_time, shown.c.upcoming, counterpart.id,
+                         counterpart.name, counterpart.image_link)
+        .outerjoin(shown, shown.c[owner_key] == model.id)
+        .outerjoin(counterpart, counterpart.id == shown.c[counterpart_key])
+        .filter(model.id == entity_id)
+        .order_by(shown.c.start_time, shown.c.id)
+        .all()
+    )
+    if not rows:
+        return None
+
+    entity, upcoming_total, past_total = rows[0][:3]
+    shows = {True: [], False: []}
+    for *_, start_time, is_upcoming, id, name, image_link in rows:
+        if start_time is not None:
+            shows[bool(is_upcoming)].append((id, name, image_link, start_time))
+    shows[False].reverse()  # latest past show first
+    return entity, shows, {True: upcoming_total, False: past_total}
+
+
+def page_validators(model, owner_key, entity_id, now=None):
+    """``(etag, last_modified)`` for a venue or artist page, or None if it is missing.
+
+    One indexed lookup: the entity's version covers edits to it, to its
+    shows and to the names and images of their artists or venues, and the
+    start of its latest past show covers shows moving from upcoming to past
+    as time goes by.
+    """
+    now = now or datetime.now()
+    last_started = (
+        select(func.max(Show.start_time))
+        .where(getattr(Show, owner_key) == model.id, Show.start_time <= now)
+        .correlate(model)
+        .scalar_subquery()
+    )
+    row = (db.session.query(model.version, model.updated_at, last_started)
+           .filter(model.id == entity_id)
+           .first())
+    if row is None:
+        return None
+    version, updated_at, last_started = row
+    if last_started is None:
+        return f'v{version}', updated_at
+    return (f'v{version}-{last_started:%Y%m%d%H%M%S}',
+            max(updated_at, last_started))
+
+
+def _show_entries(shows, prefix, time_format):
+    return [{
+        f'{prefix}_id': id,
+        f'{prefix}_name': name,
+        f'{prefix}_image_link': image_link,
+        'start_time': start_time if time_format is None else start_time.strftime(time_format),
+    } for id, name, image_link, start_time in shows]
+
+
+def load_venue(venue_id, limit=50, offset=0, now=None,
+               time_format=None):
+    """Venue page data with up to ``limit`` upcoming and past shows, or None.
+
+    Show start times stay datetimes unless a ``time_format`` is given.
+    """
+    loaded = _load(Venue, 'venue_id', Artist, 'artist_id', venue_id,
+                   limit, offset, now)
+    if loaded is None:
+        return None
+    venue, shows, totals = loaded
+    return {
+        'id': venue.id,
+        'name': venue.name,
+        'genres': venue.genres or [],
+        'address': venue.address,
+        'city': venue.city,
+        'state': venue.state,
+        'phone': venue.phone,
+        'website': venue.website,
+        'facebook_link': venue.facebook_link,
+        'seeking_talent': venue.seeking_talent,
+        'seeking_description': venue.seeking_description,
+        'image_link': venue.image_link,
+        'past_shows': _show_entries(shows[False], 'artist', time_format),
+        'upcoming_shows': _show_entries(shows[True], 'artist', time_format),
+        'past_shows_count': totals[False],
+        'upcoming_shows_count': totals[True],
+    }
+
+
+def load_artist(artist_id, limit=50, offset=0, now=None,
+                time_format=None):
+    """Artist page data with up to ``limit`` upcoming and past shows, or None.
+
+    Show start times stay datetimes unless a ``time_format`` is given.
+    """
+    loaded = _load(Artist, 'artist_id', Venue, 'venue_id', artist_id,
+                   limit, offset, now)
+    if loaded is None:
+        return None
+    artist, shows, totals = loaded
+    return {
+        'id': artist.id,
+        'name': artist.name,
+        'genres': genre_names(artist.genres),
+        'city': artist.city,
+        'state': artist.state,
+        'phone': artist.phone,
+        'website': artist.website,
+        'facebook_link': artist.facebook_link,
+        'seeking_venue': artist.seeking_venue,
+        'seeking_description': artist.seeking_description,
+        'image_link': artist.image_link,
+        'past_shows': _show_entries(shows[False], 'venue', time_format),
+        'upcoming_shows': _show_entries(shows[True], 'venue', time_format),
+        'past_shows_count': totals[False],
+        'upcoming_shows_count': totals[True],
+    }
@@ -0,0 +1,97 @@
+"""Check that each route's queries are planned onto the expected indexes.
+
+Drives the routes through the Flask test client against the configured
+database, captures every SELECT they issue and EXPLAINs it. Exits non-zero
+when an expected index is missing from a route's plans.
+
+    python explain_indexes.py [-v]
+
+Postgres plans small tables with sequential scans, so sequential scans are
+disabled for the EXPLAIN session; the check is whether the index *can* serve
+the query shape, not what the planner picks for a toy dataset.
+"""
+import sys
+
+from sqlalchemy import event
+
+from app import app
+from cache import page_cache
+from models import db, Artist, Venue
+
+# route -> indexes that must appear in the plans of its queries
+EXPECTED = [
+    ('GET', '/', None, ['ix_venues_created_date_id', 'ix_artists_created_date_id']),
+    ('GET', '/venues', None, ['ix_venues_state_city_name_id',
+                               'ix_shows_venue_id_start_time']),
+    ('GET', '/venues?genre=Jazz', None, ['ix_venues_state_city_name_id']),
+    ('GET', '/artists', None, ['ix_artists_name_id']),
+    ('GET', '/artists?genre=Jazz', None, ['ix_artists_name_id']),
+    ('GET', '/shows', None, ['ix_shows_start_time_id']),
+    ('GET', '/venues/{venue_id}', None, ['ix_shows_venue_id_start_time']),
+    ('GET', '/artists/{artist_id}', None, ['ix_shows_artist_id_start_time']),
+    ('POST', '/venues/search', {'search_term': 'a'}, ['ix_shows_venue_id_start_time']),
+    ('POST', '/artists/search', {'search_term': 'a'}, ['ix_shows_artist_id_start_time']),
+]
+
+
+def explain(connection, statement, parameters):
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        connection.exec_driver_sql('SET enable_seqscan = off')
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters)
+        plan = '\n'.join(row[0] for row in rows)
+        connection.exec_driver_sql('RESET enable_seqscan')
+    elif dialect == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)
+        plan = '\n'.join(row[-1] for row in rows)
+    else:
+        raise SystemExit(f'no EXPLAIN support for {dialect}')
+    return plan
+
+
+def capture(method, path, data):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client = app.test_client()
+        response = client.open(path, method=method, data=data)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return response.status_code, statements
+
+
+def main(verbose=False):
+    app.config['WTF_CSRF_ENABLED'] = False
+    page_cache.backend = None
+    failed = False
+    with app.app_context():
+        ids = {
+            'venue_id': db.session.query(Venue.id).order_by(Venue.id).limit(1).scalar() or 1,
+            'artist_id': db.session.query(Artist.id).order_by(Artist.id).limit(1).scalar() or 1,
+        }
+        for method, route, data, indexes in EXPECTED:
+            path = route.format(**ids)
+            status, statements = capture(method, path, data)
+            with db.engine.connect() as connection:
+                plans = [explain(connection, statement, parameters)
+                         for statement, parameters in statements]
+            missing = [index for index in indexes
+                       if not any(index in plan for plan in plans)]
+            failed = failed or bool(missing)
+            print(f'{"FAIL" if missing else "ok  "} {method:4} {path} '
+                  f'({status}, {len(statements)} queries)'
+                  + (f' missing: {", ".join(missing)}' if missing else ''))
+            if verbose or missing:
+                for (statement, _), plan in zip(statements, plans):
+                    print('    ' + ' '.join(statement.split()))
+                    print('      ' + plan.replace('\n', '\n      '))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(verbose='-v' in sys.argv))
@@ -0,0 +1,145 @@
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import date, datetime
+
+import click
+from flask import Response, abort, request, stream_with_context
+
+from models import db, Artist, Venue, Show
+
+#----------------------------------------------------------------------------#
+# Streaming export.
+#
+#   GET /export/venues.csv   /export/shows.ndjson.gz?after_id=1200000
+#   flask export artists --format ndjson --gzip -o artists.ndjson.gz
+#
+# Rows come off a server-side cursor (``yield_per``) and are encoded and
+# optionally gzipped a chunk at a time, so memory stays flat however large
+# the table. ``since`` limits venues/artists to rows created or changed
+# (``updated_at``, which also moves with their shows) at or after a
+# timestamp. Shows have no change time: ``after_id`` works for every table
+# and picks up new shows, but not shows since moved or deleted.
+#----------------------------------------------------------------------------#
+
+MODELS = {'venues': Venue, 'artists': Artist, 'shows': Show}
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+SKIPPED_COLUMNS = {'search_document'}
+ROWS_PER_CHUNK = 1000
+
+
+def export_columns(model):
+    return [column for column in model.__table__.columns
+            if column.name not in SKIPPED_COLUMNS]
+
+
+def export_query(model, since=None, after_id=None):
+    columns = export_columns(model)
+    query = db.session.query(*columns).order_by(model.id)
+    if since is not None:
+        if not hasattr(model, 'updated_at'):
+            raise ValueError(f'{model.__tablename__} has no change time; use after_id')
+        query = query.filter(model.updated_at >= since)
+    if after_id is not None:
+        query = query.filter(model.id > after_id)
+    return columns, query.yield_per(ROWS_PER_CHUNK)
+
+
+def plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def export_chunks(kind, fmt, since=None, after_id=None):
+    """The export as an iterator of text chunks of ROWS_PER_CHUNK rows.
+
+    Bad arguments raise ValueError here rather than part way through the stream.
+    """
+    columns, rows = export_query(MODELS[kind], since, after_id)
+    return row_chunks([column.name for column in columns], rows, fmt)
+
+
+def row_chunks(names, rows, fmt):
+    """Encode ``rows`` (tuples in ``names`` order) as CSV or NDJSON text chunks."""
+    buffer = io.StringIO()
+    if fmt == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        encode = lambda row: writer.writerow(
+            ','.join(value) if isinstance(value, list) else plain(value) for value in row)
+    else:
+        encode = lambda row: buffer.write(
+            json.dumps(dict(zip(names, map(plain, row)))) + '\n')
+
+    pending = 0
+    for row in rows:
+        encode(row)
+        pending += 1
+        if pending == ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def encoded(chunks, compress=False):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        if compressor is not None:
+            data = compressor.compress(data)
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def init_app(app):
+    @app.route('/export/<kind>.<fmt>')
+    @app.route('/export/<kind>.<fmt>.gz', defaults={'compress': True})
+    def export(kind, fmt, compress=False):
+        if kind not in MODELS or fmt not in FORMATS:
+            abort(404)
+        try:
+            # args.get(type=...) would turn a malformed value into None.
+            since = request.args.get('since')
+            since = datetime.fromisoformat(since) if since else None
+            after_id = request.args.get('after_id')
+            after_id = int(after_id) if after_id else None
+            chunks = export_chunks(kind, fmt, since, after_id)
+        except ValueError:
+            abort(400)
+        filename = f'{kind}.{fmt}' + ('.gz' if compress else '')
+        return Response(
+            stream_with_context(encoded(chunks, compress)),
+            mimetype='application/gzip' if compress else FORMATS[fmt],
+            headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+    @app.cli.command('export')
+    @click.argument('kind', type=click.Choice(sorted(MODELS)))
+    @click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='csv',
+                  show_default=True)
+    @click.option('--gzip', 'compress', is_flag=True)
+    @click.option('--since', type=click.DateTime(),
+                  help='Only venues/artists created or changed at or after this time '
+                       '(not for shows, which have no change time).')
+    @click.option('--after-id', type=int, help='Only rows with a larger id.')
+    @click.option('-o', '--output', type=click.Path(dir_okay=False),
+                  help='Write here instead of stdout.')
+    def export_command(kind, fmt, compress, since, after_id, output):
+        """Stream a table out as CSV or NDJSON."""
+        try:
+            chunks = encoded(export_chunks(kind, fmt, since, after_id), compress)
+        except ValueError as e:
+            raise click.UsageError(str(e))
+        out = open(output, 'wb') if output else sys.stdout.buffer
+        try:
+            for data in chunks:
+                out.write(data)
+        finally:
+            if output:
+                out.close()
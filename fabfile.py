@@ -13,6 +13,14 @@ def test():
         abort("Aborted at user request.")
 
 
+def bench(output='bench.json'):
+    local("python benchmark.py --output {}".format(output))
+
+
+def assets():
+    local("flask assets build")
+
+
 def commit():
     message = raw_input("Enter a git commit message: ")
     local("git add . && git commit -am '{}'".format(message))
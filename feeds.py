@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from models import db, Artist, Venue, Show
+from pagination import keyset_page
+
+#----------------------------------------------------------------------------#
+# Shows feed.
+#----------------------------------------------------------------------------#
+
+UPCOMING = 'upcoming'
+PAST = 'past'
+
+
+def shows_feed(when=None, start=None, end=None, after=None, limit=50, now=None,
+               time_format=None):
+    """One page of shows joined to their venue and artist.
+
+    ``when`` narrows to upcoming or past shows, ``start``/``end`` to a
+    [start, end) window. Upcoming and unfiltered feeds run oldest first; the
+    past feed runs most recent first. Returns ``(shows, next_after)`` where
+    ``next_after`` is the (start_time, id) key to resume from, or None on the
+    last page. Start times are datetimes, or strings in ``time_format``.
+    """
+    now = now or datetime.now()
+    query = (
+        db.session.query(Show.id, Show.start_time,
+                         Show.venue_id, Venue.name.label('venue_name'),
+                         Show.artist_id, Artist.name.label('artist_name'),
+                         Artist.image_link.label('artist_image_link'))
+        .join(Venue, Venue.id == Show.venue_id)
+        .join(Artist, Artist.id == Show.artist_id)
+    )
+    if when == UPCOMING:
+        query = query.filter(Show.start_time > now)
+    elif when == PAST:
+        query = query.filter(Show.start_time <= now)
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+
+    rows, next_after = keyset_page(query, (Show.start_time, Show.id),
+                                   after=after, limit=limit,
+                                   descending=(when == PAST))
+    shows = [{
+        'id': row.id,
+        'venue_id': row.venue_id,
+        'venue_name': row.venue_name,
+        'artist_id': row.artist_id,
+        'artist_name': row.artist_name,
+        'artist_image_link': row.artist_image_link,
+        'start_time': (row.start_time if time_format is None
+                       else row.start_time.strftime(time_format)),
+    } for row in rows]
+    return shows, next_after
@@ -0,0 +1,100 @@
+import click
+from sqlalchemy import exists, func, or_, select
+
+from models import db, Genre, GENRE_LINKS, link_genres
+
+#----------------------------------------------------------------------------#
+# Genre filters and facets.
+#
+# ``has_genre`` filters venues or artists through the link tables: one probe
+# of the (owner, genre) primary key per candidate row, or a range of the
+# (genre, owner) index when the planner drives from the genre. Listing
+# facets read the stored per-genre counts (a row per genre, however many
+# venues); search facets count the genres of the matching rows.
+#
+# The model hooks keep links and counts current for ORM writes. Rows written
+# around the ORM need
+#
+#   flask genres backfill    link every venue and artist, in id batches
+#   flask genres recount     recompute the counts, e.g. after bulk deletes
+#----------------------------------------------------------------------------#
+
+
+def has_genre(model, name):
+    links, key, _ = GENRE_LINKS[model]
+    genre_id = select(Genre.id).where(Genre.name == name).scalar_subquery()
+    return exists().where(links.c[key] == model.id, links.c.genre_id == genre_id)
+
+
+def genre_facets(model):
+    """``[{'name', 'count'}]`` for every genre with venues (or artists), by name."""
+    count = Genre.__table__.c[GENRE_LINKS[model][2]]
+    rows = db.session.execute(
+        select(Genre.name, count).where(count > 0).order_by(Genre.name))
+    return [{'name': name, 'count': n} for name, n in rows]
+
+
+def genre_counts():
+    """``[{'name', 'venues', 'artists'}]`` for every genre in use, by name."""
+    rows = db.session.execute(
+        select(Genre.name, Genre.venue_count, Genre.artist_count)
+        .where(or_(Genre.venue_count > 0, Genre.artist_count > 0))
+        .order_by(Genre.name))
+    return [{'name': name, 'venues': venues, 'artists': artists}
+            for name, venues, artists in rows]
+
+
+def matched_genre_facets(model, ids):
+    """Like ``genre_facets``, counting only the rows whose id is in ``ids``."""
+    links, key, _ = GENRE_LINKS[model]
+    rows = db.session.execute(
+        select(Genre.name, func.count())
+        .join(links, links.c.genre_id == Genre.id)
+        .where(links.c[key].in_(ids))
+        .group_by(Genre.name)
+        .order_by(Genre.name))
+    return [{'name': name, 'count': n} for name, n in rows]
+
+
+def backfill(batch_size=5000, echo=click.echo):
+    """Link every venue and artist to its genres, one committed id range at a time."""
+    for model in GENRE_LINKS:
+        last_id = db.session.query(db.func.max(model.id)).scalar() or 0
+        for start in range(0, last_id, batch_size):
+            rows = db.session.execute(
+                select(model.id, model.genres)
+                .where(model.id > start, model.id <= start + batch_size)).all()
+            link_genres(db.session.connection(), model, rows)
+            db.session.commit()
+        echo(f'{model.__tablename__}: linked ids up to {last_id}')
+
+
+def recount():
+    """Recompute the venue and artist count of every genre."""
+    genres = Genre.__table__
+    counts = {}
+    for links, key, count in GENRE_LINKS.values():
+        counts[count] = (select(func.count())
+                         .where(links.c.genre_id == genres.c.id)
+                         .correlate(genres)
+                         .scalar_subquery())
+    rows = db.session.execute(genres.update().values(**counts)).rowcount
+    db.session.commit()
+    return rows
+
+
+def init_app(app):
+    @app.cli.group('genres')
+    def genres_command():
+        """Genre links and counts."""
+
+    @genres_command.command('backfill')
+    @click.option('--batch-size', default=5000, show_default=True)
+    def backfill_command(batch_size):
+        """Link existing venues and artists to the genres table."""
+        backfill(batch_size)
+
+    @genres_command.command('recount')
+    def recount_command():
+        """Recompute the stored venue and artist count of every genre."""
+        click.echo(f'{recount()} genres recounted')
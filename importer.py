@@ -0,0 +1,328 @@
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+import click
+from werkzeug.datastructures import MultiDict
+
+from forms import ArtistForm, ShowForm, VenueForm
+from models import (db, Artist, Venue, Show, GENRE_LINKS, SHOW_OWNERS,
+                    build_search_document, link_genres, refresh_counters, touch)
+
+#----------------------------------------------------------------------------#
+# Bulk import.
+#
+#   flask import venues lineup-venues.csv
+#   flask import shows lineup-shows.jsonl --resume
+#
+# Files are read a row at a time (CSV with a header row, or JSON lines) and
+# handled in batches: every row is validated with the same WTForms form the
+# web handler uses, show rows have their venue/artist references resolved
+# with one query per batch, and valid rows are written with one executemany
+# (or COPY on Postgres) and committed. After each commit the number of rows
+# consumed is saved next to the input file, so ``--resume`` carries on after
+# the last committed batch. Rejected rows go to ``--rejects`` with the reason.
+# Shows are not checked for double bookings row by row; run
+# ``flask shows conflicts`` over the imported window afterwards.
+#----------------------------------------------------------------------------#
+
+FIELD_ALIASES = {'website': 'website_link'}
+BOOLEAN_FIELDS = {'seeking_talent', 'seeking_venue'}
+FALSE_STRINGS = {'', '0', 'false', 'no', 'n', 'off'}
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def as_list(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(',') if part.strip()]
+    return list(value)
+
+
+def formdata(row, multiple=()):
+    data = MultiDict()
+    for key, value in row.items():
+        key = FIELD_ALIASES.get(key, key)
+        if key in multiple:
+            for item in as_list(value):
+                data.add(key, item)
+        elif key in BOOLEAN_FIELDS:
+            if value is not None and str(value).lower() not in FALSE_STRINGS:
+                data.add(key, 'y')
+        elif key == 'start_time' and value:
+            data.add(key, str(value).replace('T', ' '))
+        elif value is not None:
+            data.add(key, str(value))
+    return data
+
+
+def validate(form_class, row, multiple=()):
+    """Return (form, None) if the row passes the form's validators, else (None, errors)."""
+    form = form_class(formdata=formdata(row, multiple), meta={'csrf': False})
+    try:
+        if form.validate():
+            return form, None
+    except Exception as e:  # VenueForm.validate_phone raises a non-WTForms error
+        return None, str(e)
+    return None, json.dumps(form.errors)
+
+
+def venue_values(form):
+    return {
+        'name': form.name.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'address': form.address.data,
+        'phone': form.phone.data,
+        'image_link': form.image_link.data,
+        'genres': form.genres.data,
+        'facebook_link': form.facebook_link.data,
+        'website': form.website_link.data,
+        'seeking_talent': form.seeking_talent.data,
+        'seeking_description': form.seeking_description.data,
+    }
+
+
+def artist_values(form):
+    return {
+        'name': form.name.data,
+        'city': form.city.data,
+        'state': form.state.data,
+        'phone': form.phone.data,
+        'website': form.website_link.data,
+        'genres': ','.join(form.genres.data),
+        'image_link': form.image_link.data,
+        'facebook_link': form.facebook_link.data,
+        'seeking_venue': form.seeking_venue.data,
+        'seeking_description': form.seeking_description.data,
+    }
+
+
+def resolve(model, ids, names):
+    """Map the ids and names referenced by a batch to ids that exist, in two queries."""
+    found_ids = set()
+    if ids:
+        found_ids = {id for id, in db.session.query(model.id).filter(model.id.in_(ids))}
+    by_name = {}
+    if names:
+        for id, name in db.session.query(model.id, model.name).filter(model.name.in_(names)):
+            by_name.setdefault(name, []).append(id)
+    return found_ids, by_name
+
+
+def show_reference(row, key, found_ids, by_name):
+    value = row.get(f'{key}_id')
+    if value not in (None, ''):
+        return int(value) if str(value).isdigit() and int(value) in found_ids else None
+    matches = by_name.get(row.get(f'{key}_name'), [])
+    return matches[0] if len(matches) == 1 else None
+
+
+def prepare_venues(rows, now):
+    for row in rows:
+        form, errors = validate(VenueForm, row, multiple=('genres',))
+        if form is None:
+            yield row, None, errors
+            continue
+        values = venue_values(form)
+        values['created_date'] = values['updated_at'] = now
+        values['search_document'] = build_search_document(
+            values['name'], values['city'], values['state'], values['genres'])
+        yield row, values, None
+
+
+def prepare_artists(rows, now):
+    for row in rows:
+        form, errors = validate(ArtistForm, row, multiple=('genres',))
+        if form is None:
+            yield row, None, errors
+            continue
+        values = artist_values(form)
+        values['created_date'] = values['updated_at'] = now
+        values['search_document'] = build_search_document(
+            values['name'], values['city'], values['state'], values['genres'])
+        yield row, values, None
+
+
+def prepare_shows(rows, now):
+    # Venue and artist columns may hold ids or names; a show row needs
+    # venue_id or venue_name, and artist_id or artist_name.
+    def ids(key):
+        return {int(row[f'{key}_id']) for row in rows
+                if str(row.get(f'{key}_id') or '').isdigit()}
+
+    def names(key):
+        return {row[f'{key}_name'] for row in rows
+                if not row.get(f'{key}_id') and row.get(f'{key}_name')}
+
+    venues = resolve(Venue, ids('venue'), names('venue'))
+    artists = resolve(Artist, ids('artist'), names('artist'))
+    for row in rows:
+        venue_id = show_reference(row, 'venue', *venues)
+        artist_id = show_reference(row, 'artist', *artists)
+        if venue_id is None or artist_id is None:
+            yield row, None, 'unknown or ambiguous {}'.format(
+                ' and '.join(key for key, id in (('venue', venue_id), ('artist', artist_id))
+                             if id is None))
+            continue
+        form, errors = validate(ShowForm, dict(row, venue_id=venue_id, artist_id=artist_id))
+        if form is None:
+            yield row, None, errors
+            continue
+        start_time = form.start_time.data
+        yield row, {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time,
+                    'end_time': start_time + timedelta(minutes=form.duration.data)}, None
+
+
+KINDS = {
+    'venues': (Venue, prepare_venues),
+    'artists': (Artist, prepare_artists),
+    'shows': (Show, prepare_shows),
+}
+
+
+def copy_literal(value):
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return '{' + ','.join('"{}"'.format(item.replace('\\', '\\\\').replace('"', '\\"'))
+                              for item in value) + '}'
+    return value
+
+
+def copy_rows(table, rows):
+    """COPY ... FROM STDIN for Postgres (psycopg2); False if not available."""
+    cursor = db.session.connection().connection.cursor()
+    if not hasattr(cursor, 'copy_expert'):
+        return False
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([copy_literal(row[column]) for column in columns])
+    buffer.seek(0)
+    cursor.copy_expert('COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        table.name, ', '.join(columns)), buffer)
+    return True
+
+
+def write_batch(table, rows, use_copy):
+    if not rows:
+        return
+    if not (use_copy and copy_rows(table, rows)):
+        db.session.execute(table.insert(), rows)
+
+
+class Checkpoint:
+
+    def __init__(self, path):
+        self.path = path + '.import-state'
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {'rows_done': 0, 'inserted': 0, 'rejected': 0}
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, state):
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def run_import(kind, path, batch_size=1000, resume=False, rejects=None,
+               use_copy=None, echo=click.echo):
+    model, prepare = KINDS[kind]
+    if use_copy is None:
+        use_copy = db.engine.dialect.name == 'postgresql'
+    checkpoint = Checkpoint(path)
+    state = checkpoint.load() if resume else {'rows_done': 0, 'inserted': 0, 'rejected': 0}
+    rows = read_rows(path)
+    if state['rows_done']:
+        echo(f'resuming after row {state["rows_done"]}')
+        for _ in islice(rows, state['rows_done']):
+            pass
+
+    reject_file = open(rejects, 'a', encoding='utf-8') if rejects else None
+    started = time.perf_counter()
+    done_this_run = 0
+    try:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            now = datetime.now()
+            valid = []
+            for row, values, errors in prepare(batch, now):
+                if values is not None:
+                    valid.append(values)
+                    continue
+                state['rejected'] += 1
+                if reject_file is not None:
+                    reject_file.write(json.dumps({'row': row, 'errors': errors}, default=str) + '\n')
+            if model in GENRE_LINKS:
+                last_id = db.session.query(db.func.max(model.id)).scalar() or 0
+            write_batch(model.__table__, valid, use_copy)
+            if model in GENRE_LINKS:
+                # Bulk inserts skip the ORM hooks that link venues and artists to genres.
+                link_genres(db.session.connection(), model, db.session.execute(
+                    db.select(model.id, model.genres).where(model.id > last_id)).all())
+            if model is Show:
+                # Bulk inserts skip the ORM hooks that version and count show owners.
+                for owner, key in SHOW_OWNERS:
+                    ids = {row[key] for row in valid}
+                    touch(db.session.connection(), owner, ids)
+                    refresh_counters(db.session.connection(), owner, key, ids=ids)
+            db.session.commit()
+
+            state['rows_done'] += len(batch)
+            state['inserted'] += len(valid)
+            done_this_run += len(batch)
+            checkpoint.save(state)
+            elapsed = time.perf_counter() - started
+            echo(f'{kind}: {state["rows_done"]} rows read, {state["inserted"]} inserted, '
+                 f'{state["rejected"]} rejected ({done_this_run / elapsed:.0f} rows/s)')
+    except Exception:
+        db.session.rollback()
+        echo(f'import stopped; rerun with --resume to continue after row {state["rows_done"]}')
+        raise
+    finally:
+        if reject_file is not None:
+            reject_file.close()
+    checkpoint.clear()
+    return state
+
+
+def init_app(app):
+    @app.cli.command('import')
+    @click.argument('kind', type=click.Choice(sorted(KINDS)))
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--batch-size', default=1000, show_default=True)
+    @click.option('--resume', is_flag=True,
+                  help='Skip the rows committed by a previous, interrupted run.')
+    @click.option('--rejects', type=click.Path(dir_okay=False),
+                  help='Append rejected rows and their errors to this JSONL file.')
+    @click.option('--copy/--no-copy', 'use_copy', default=None,
+                  help='Use COPY (default on Postgres) instead of executemany.')
+    def import_command(kind, path, batch_size, resume, rejects, use_copy):
+        """Stream venues, artists or shows from a CSV or JSONL file."""
+        with app.test_request_context():
+            run_import(kind, path, batch_size, resume, rejects, use_copy)
@@ -0,0 +1,52 @@
+"""search documents and indexes
+
+Revision ID: 4c1f9a7d2b3e
+Revises: b00278005f2e
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1f9a7d2b3e'
+down_revision = 'b00278005f2e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('venues', sa.Column('search_document', sa.Text(), nullable=True))
+    op.add_column('artists', sa.Column('search_document', sa.Text(), nullable=True))
+
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Mirrors models.build_search_document for rows written before this revision.
+    op.execute("""
+        UPDATE venues SET search_document = lower(concat_ws(' ',
+            name, city, state, array_to_string(genres, ' ')))
+    """)
+    op.execute("""
+        UPDATE artists SET search_document = lower(concat_ws(' ',
+            name, city, state, translate(genres, ',.', '  ')))
+    """)
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in ('venues', 'artists'):
+        op.create_index(f'ix_{table}_search_document_trgm', table,
+                        ['search_document'], postgresql_using='gin',
+                        postgresql_ops={'search_document': 'gin_trgm_ops'})
+        op.create_index(f'ix_{table}_search_document_tsv', table,
+                        [sa.text("to_tsvector('simple', coalesce(search_document, ''))")],
+                        postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in ('venues', 'artists'):
+            op.drop_index(f'ix_{table}_search_document_tsv', table_name=table)
+            op.drop_index(f'ix_{table}_search_document_trgm', table_name=table)
+    op.drop_column('artists', 'search_document')
+    op.drop_column('venues', 'search_document')
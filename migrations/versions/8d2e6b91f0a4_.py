@@ -0,0 +1,54 @@
+"""indexes for the hot query shapes
+
+Revision ID: 8d2e6b91f0a4
+Revises: 4c1f9a7d2b3e
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e6b91f0a4'
+down_revision = '4c1f9a7d2b3e'
+branch_labels = None
+depends_on = None
+
+# name, table, columns -- kept in step with __table_args__ in models.py.
+INDEXES = [
+    # show counts and detail pages: WHERE venue_id/artist_id = ? AND start_time ...
+    ('ix_shows_venue_id_start_time', 'shows', ['venue_id', 'start_time']),
+    ('ix_shows_artist_id_start_time', 'shows', ['artist_id', 'start_time']),
+    # /shows feed: keyset on (start_time, id)
+    ('ix_shows_start_time_id', 'shows', ['start_time', 'id']),
+    # home page: ORDER BY created_date DESC LIMIT 10
+    ('ix_venues_created_date', 'venues', ['created_date']),
+    ('ix_artists_created_date', 'artists', ['created_date']),
+    # /venues areas: keyset on (state, city, name, id); /artists on (name, id)
+    ('ix_venues_state_city_name_id', 'venues', ['state', 'city', 'name', 'id']),
+    ('ix_artists_name_id', 'artists', ['name', 'id']),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        # CONCURRENTLY cannot run inside the migration transaction.
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns,
+                                postgresql_concurrently=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for name, table, _ in INDEXES:
+                op.drop_index(name, table_name=table,
+                              postgresql_concurrently=True)
+    else:
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,49 @@
+"""break created_date ties by id on the home page indexes
+
+Revision ID: a3c9e1f7b5d8
+Revises: f2b7d4e9a6c3
+Create Date: 2026-10-18 20:03:44.267190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e1f7b5d8'
+down_revision = 'f2b7d4e9a6c3'
+branch_labels = None
+depends_on = None
+
+# Rows created before created_date defaulted per row share their process's
+# start time; the home page orders by (created_date, id) so those come
+# newest id first.
+TABLES = ['venues', 'artists']
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table in TABLES:
+                op.create_index(f'ix_{table}_created_date_id', table, ['created_date', 'id'],
+                                postgresql_concurrently=True)
+                op.drop_index(f'ix_{table}_created_date', table_name=table,
+                              postgresql_concurrently=True)
+    else:
+        for table in TABLES:
+            op.create_index(f'ix_{table}_created_date_id', table, ['created_date', 'id'])
+            op.drop_index(f'ix_{table}_created_date', table_name=table)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            for table in TABLES:
+                op.create_index(f'ix_{table}_created_date', table, ['created_date'],
+                                postgresql_concurrently=True)
+                op.drop_index(f'ix_{table}_created_date_id', table_name=table,
+                              postgresql_concurrently=True)
+    else:
+        for table in TABLES:
+            op.create_index(f'ix_{table}_created_date', table, ['created_date'])
+            op.drop_index(f'ix_{table}_created_date_id', table_name=table)
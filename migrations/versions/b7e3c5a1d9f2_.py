@@ -0,0 +1,35 @@
+"""venue and artist versions for conditional GET
+
+Revision ID: b7e3c5a1d9f2
+Revises: 8d2e6b91f0a4
+Create Date: 2026-10-18 14:20:41.208316
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3c5a1d9f2'
+down_revision = '8d2e6b91f0a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('venues', 'artists'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False,
+                                       server_default='1'))
+        op.execute(f'UPDATE {table} SET updated_at = created_date')
+        with op.batch_alter_table(table) as batch_op:
+            # Rows written outside the ORM (COPY imports) get the time of the write.
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(),
+                                  nullable=False, server_default=sa.func.now())
+
+
+def downgrade():
+    for table in ('artists', 'venues'):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('version')
+            batch_op.drop_column('updated_at')
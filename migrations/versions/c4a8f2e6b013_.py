@@ -0,0 +1,54 @@
+"""stored upcoming/past show counters on venues and artists
+
+Revision ID: c4a8f2e6b013
+Revises: b7e3c5a1d9f2
+Create Date: 2026-10-18 16:05:12.774120
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8f2e6b013'
+down_revision = 'b7e3c5a1d9f2'
+branch_labels = None
+depends_on = None
+
+OWNERS = [('venues', 'venue_id'), ('artists', 'artist_id')]
+
+
+def upgrade():
+    # The app compares against local naive datetime.now(), not the server clock.
+    now = datetime.now()
+    for table, key in OWNERS:
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(),
+                                       nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(),
+                                       nullable=False, server_default='0'))
+        op.add_column(table, sa.Column('next_show_time', sa.DateTime(), nullable=True))
+        op.create_index(f'ix_{table}_next_show_time', table, ['next_show_time'])
+        # Same recount as models.refresh_counters.
+        op.execute(sa.text(f"""
+            UPDATE {table} SET
+              upcoming_shows_count = (SELECT count(*) FROM shows
+                                      WHERE shows.{key} = {table}.id
+                                        AND shows.start_time > :now),
+              past_shows_count = (SELECT count(*) FROM shows
+                                  WHERE shows.{key} = {table}.id
+                                    AND shows.start_time <= :now),
+              next_show_time = (SELECT min(start_time) FROM shows
+                                WHERE shows.{key} = {table}.id
+                                  AND shows.start_time > :now)
+        """).bindparams(now=now))
+
+
+def downgrade():
+    for table, _ in OWNERS:
+        op.drop_index(f'ix_{table}_next_show_time', table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('next_show_time')
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
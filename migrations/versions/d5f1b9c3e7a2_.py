@@ -0,0 +1,48 @@
+"""genres table with venue and artist link tables
+
+Revision ID: d5f1b9c3e7a2
+Revises: c4a8f2e6b013
+Create Date: 2026-10-18 17:12:36.540218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f1b9c3e7a2'
+down_revision = 'c4a8f2e6b013'
+branch_labels = None
+depends_on = None
+
+LINKS = [('venue_genres', 'venues', 'venue_id'), ('artist_genres', 'artists', 'artist_id')]
+
+
+def upgrade():
+    op.create_table(
+        'genres',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=False),
+        sa.Column('venue_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('artist_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    for table, owners, key in LINKS:
+        op.create_table(
+            table,
+            sa.Column(key, sa.Integer(), nullable=False),
+            sa.Column('genre_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint([key], [f'{owners}.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['genre_id'], ['genres.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint(key, 'genre_id'),
+        )
+        op.create_index(f'ix_{table}_genre_id_{key}', table, ['genre_id', key])
+    # Existing rows are linked in batches by `flask genres backfill`.
+
+
+def downgrade():
+    for table, _, key in LINKS:
+        op.drop_index(f'ix_{table}_genre_id_{key}', table_name=table)
+        op.drop_table(table)
+    op.drop_table('genres')
@@ -0,0 +1,50 @@
+"""show end times and overlap indexes
+
+Revision ID: e8a3c6d2f4b1
+Revises: d5f1b9c3e7a2
+Create Date: 2026-10-18 18:40:09.112637
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a3c6d2f4b1'
+down_revision = 'd5f1b9c3e7a2'
+branch_labels = None
+depends_on = None
+
+OWNER_KEYS = ['venue_id', 'artist_id']
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    op.add_column('shows', sa.Column('end_time', sa.DateTime(), nullable=True))
+    # Existing shows get models.SHOW_DEFAULT_DURATION.
+    if postgresql:
+        op.execute("UPDATE shows SET end_time = start_time + interval '2 hours'")
+    else:
+        op.execute("UPDATE shows SET end_time = "
+                   "strftime('%Y-%m-%d %H:%M:%S.000000', start_time, '+2 hours')")
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.alter_column('end_time', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_check_constraint('ck_shows_end_time_after_start_time',
+                                         'end_time > start_time')
+
+    if postgresql:
+        # Booking checks: venue_id = ? AND tsrange(start_time, end_time) && ?
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        for key in OWNER_KEYS:
+            op.create_index(f'ix_shows_{key}_during', 'shows',
+                            [sa.text(key), sa.text('tsrange(start_time, end_time)')],
+                            postgresql_using='gist')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for key in OWNER_KEYS:
+            op.drop_index(f'ix_shows_{key}_during', table_name='shows')
+    with op.batch_alter_table('shows') as batch_op:
+        batch_op.drop_constraint('ck_shows_end_time_after_start_time', type_='check')
+        batch_op.drop_column('end_time')
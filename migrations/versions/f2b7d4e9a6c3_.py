@@ -0,0 +1,34 @@
+"""BRIN index on show start times
+
+Revision ID: f2b7d4e9a6c3
+Revises: e8a3c6d2f4b1
+Create Date: 2026-10-18 19:26:51.803344
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7d4e9a6c3'
+down_revision = 'e8a3c6d2f4b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Calendar windows: start_time >= ? AND start_time < ?. Elsewhere the
+    # (start_time, id) B-tree serves them.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.create_index('ix_shows_start_time_brin', 'shows', ['start_time'],
+                        postgresql_using='brin', postgresql_concurrently=True)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_shows_start_time_brin', table_name='shows',
+                      postgresql_concurrently=True)
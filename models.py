@@ -1,6 +1,11 @@
-from datetime import datetime
+import re
+from collections import Counter
+from datetime import datetime, timedelta
 # from app import db
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import case, event, func, inspect, or_, select, tuple_
+
+from replicas import RoutingSession
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
@@ -10,7 +15,7 @@ from flask_sqlalchemy import SQLAlchemy
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Venue(db.Model):
     __tablename__ = 'venues'
@@ -26,10 +31,24 @@ class Venue(db.Model):
     website = db.Column(db.String())
     seeking_talent = db.Column(db.Boolean, default=False)
     seeking_description = db.Column(db.Text)
-    genres = db.Column(db.ARRAY(db.String(120)))
-    created_date = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    # A JSON list on SQLite, which has no arrays (local runs and tests).
+    genres = db.Column(db.ARRAY(db.String(120)).with_variant(db.JSON(), 'sqlite'))
+    created_date = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    search_document = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.now, server_default=func.now(),
+                           nullable=False)
+    version = db.Column(db.Integer, default=1, nullable=False)
+    upcoming_shows_count = db.Column(db.Integer, default=0, nullable=False)
+    past_shows_count = db.Column(db.Integer, default=0, nullable=False)
+    next_show_time = db.Column(db.DateTime)
     shows = db.relationship('Show', backref='venues', lazy='dynamic', cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_venues_created_date_id', 'created_date', 'id'),
+        db.Index('ix_venues_state_city_name_id', 'state', 'city', 'name', 'id'),
+        db.Index('ix_venues_next_show_time', 'next_show_time'),
+    )
+
     def __repr__(self):
         return f'{__class__.__name__}(name=\'{self.name}\')'
 
@@ -48,9 +67,22 @@ class Artist(db.Model):
     facebook_link = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean(), default=False)
     seeking_description = db.Column(db.String(120))
-    created_date = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    created_date = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    search_document = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.now, server_default=func.now(),
+                           nullable=False)
+    version = db.Column(db.Integer, default=1, nullable=False)
+    upcoming_shows_count = db.Column(db.Integer, default=0, nullable=False)
+    past_shows_count = db.Column(db.Integer, default=0, nullable=False)
+    next_show_time = db.Column(db.DateTime)
     shows = db.relationship('Show', backref='artists', cascade='all, delete-orphan', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_artists_created_date_id', 'created_date', 'id'),
+        db.Index('ix_artists_name_id', 'name', 'id'),
+        db.Index('ix_artists_next_show_time', 'next_show_time'),
+    )
+
     def __repr__(self):
         return f'{__class__.__name__}(name={self.name}, )'
 
@@ -61,6 +93,337 @@ class Show(db.Model):
     venue_id = db.Column(db.Integer, db.ForeignKey('venues.id'), nullable=False)
     artist_id = db.Column(db.Integer, db.ForeignKey('artists.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_shows_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_shows_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_shows_start_time_id', 'start_time', 'id'),
+        db.CheckConstraint('end_time > start_time', name='ck_shows_end_time_after_start_time'),
+    )
+
+    def __repr__(self):
+        return f'{__class__.__name__}(id={self.start_time}, )'
+
+
+
+class Genre(db.Model):
+    __tablename__ = 'genres'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+    venue_count = db.Column(db.Integer, default=0, nullable=False)
+    artist_count = db.Column(db.Integer, default=0, nullable=False)
 
     def __repr__(self):
-        return f'{__class__.__name__}(id={self.start_time}, )'
\ No newline at end of file
+        return f'{__class__.__name__}(name={self.name!r})'
+
+
+venue_genres = db.Table(
+    'venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey('venues.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id'),
+)
+
+artist_genres = db.Table(
+    'artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey('artists.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genres.id', ondelete='CASCADE'),
+              primary_key=True),
+    db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id'),
+)
+
+#----------------------------------------------------------------------------#
+# Search documents.
+#----------------------------------------------------------------------------#
+
+def build_search_document(name, city, state, genres):
+    # Venue.genres is a list, Artist.genres a ',' (or '.') joined string.
+    if isinstance(genres, str):
+        genres = genres.replace(',', ' ').replace('.', ' ')
+    elif genres:
+        genres = ' '.join(genres)
+    return ' '.join(part for part in (name, city, state, genres) if part).lower()
+
+
+@event.listens_for(Venue, 'before_insert')
+@event.listens_for(Venue, 'before_update')
+@event.listens_for(Artist, 'before_insert')
+@event.listens_for(Artist, 'before_update')
+def refresh_search_document(mapper, connection, target):
+    target.search_document = build_search_document(
+        target.name, target.city, target.state, target.genres)
+
+
+#----------------------------------------------------------------------------#
+# Versions.
+#
+# ``version`` and ``updated_at`` on a venue or artist move whenever its page
+# would change because of a write: an edit to the row itself, a show of its
+# being added, moved or removed (see count_show below), or a new name or
+# image for an artist or venue it has shows with, which its page lists.
+# Detail pages use them as validators.
+#----------------------------------------------------------------------------#
+
+UNVERSIONED_COLUMNS = {'search_document', 'updated_at', 'version'}
+
+
+def touch(connection, model, ids):
+    """Bump the version of the given venues or artists in one UPDATE."""
+    ids = {id for id in ids if id is not None}
+    if ids:
+        table = model.__table__
+        connection.execute(
+            table.update()
+            .where(table.c.id.in_(ids))
+            .values(version=table.c.version + 1, updated_at=datetime.now()))
+
+
+def columns_changed(mapper, target, skip=()):
+    # before/after_update also fire for rows that are merely dirty (e.g. a
+    # collection changed), so look for a real column change.
+    state = inspect(target)
+    return any(state.attrs[attr.key].history.has_changes()
+               for attr in mapper.column_attrs if attr.key not in skip)
+
+
+@event.listens_for(Venue, 'before_update')
+@event.listens_for(Artist, 'before_update')
+def bump_version(mapper, connection, target):
+    if columns_changed(mapper, target, skip=UNVERSIONED_COLUMNS):
+        target.version = type(target).version + 1
+        target.updated_at = datetime.now()
+
+
+# What a page shows of the other side of each of its shows.
+COUNTERPART_COLUMNS = ('name', 'image_link')
+
+
+@event.listens_for(Venue, 'after_update')
+@event.listens_for(Artist, 'after_update')
+def touch_counterparts(mapper, connection, target):
+    state = inspect(target)
+    if not any(state.attrs[key].history.has_changes() for key in COUNTERPART_COLUMNS):
+        return
+    if isinstance(target, Venue):
+        key, counterpart, counterpart_key = 'venue_id', Artist, 'artist_id'
+    else:
+        key, counterpart, counterpart_key = 'artist_id', Venue, 'venue_id'
+    shows, table = Show.__table__, counterpart.__table__
+    # One UPDATE over the (owner, start_time) index, however many shows.
+    connection.execute(
+        table.update()
+        .where(table.c.id.in_(select(shows.c[counterpart_key]).where(shows.c[key] == target.id)))
+        .values(version=table.c.version + 1, updated_at=datetime.now()))
+
+
+#----------------------------------------------------------------------------#
+# Show times.
+#
+# A show runs over [start_time, end_time). Shows written without an end run
+# for SHOW_DEFAULT_DURATION, and moving a show's start moves its end with
+# it. No show may run longer than SHOW_MAX_DURATION: the conflict checks in
+# conflicts.py rely on that to bound their index range scans.
+#----------------------------------------------------------------------------#
+
+SHOW_DEFAULT_DURATION = timedelta(hours=2)
+SHOW_MAX_DURATION = timedelta(hours=24)
+
+
+@event.listens_for(Show, 'before_insert')
+def default_end_time(mapper, connection, target):
+    if target.end_time is None:
+        target.end_time = target.start_time + SHOW_DEFAULT_DURATION
+
+
+@event.listens_for(Show, 'before_update')
+def keep_duration(mapper, connection, target):
+    state = inspect(target)
+    start, end = state.attrs.start_time.history, state.attrs.end_time.history
+    if start.deleted and start.added and not end.has_changes():
+        target.end_time = target.end_time + (start.added[0] - start.deleted[0])
+
+
+#----------------------------------------------------------------------------#
+# Show counters.
+#
+# Venues and artists store their upcoming and past show counts and the start
+# of their next show. Show writes adjust them in place, so a row is exact
+# while its next_show_time is in the future (or NULL). Once that show starts
+# the row is stale until ``refresh_counters`` recounts it: the rollover job
+# does that for every stale row, and readers (counters.py) recount stale
+# rows on the fly meanwhile.
+#----------------------------------------------------------------------------#
+
+SHOW_OWNERS = ((Venue, 'venue_id'), (Artist, 'artist_id'))
+
+
+def live_counters(model, key, now):
+    """Correlated subqueries recounting the counter columns of ``model`` at ``now``."""
+    shows = Show.__table__
+    owner = model.__table__
+
+    def scalar(expression, *where):
+        return (select(expression)
+                .where(shows.c[key] == owner.c.id, *where)
+                .correlate(owner)
+                .scalar_subquery())
+    return {
+        'upcoming_shows_count': scalar(func.count(), shows.c.start_time > now),
+        'past_shows_count': scalar(func.count(), shows.c.start_time <= now),
+        'next_show_time': scalar(func.min(shows.c.start_time), shows.c.start_time > now),
+    }
+
+
+def refresh_counters(connection, model, key, ids=None, now=None, stale_only=False):
+    """Recount the given (default: all, or all stale) rows; returns how many."""
+    now = now or datetime.now()
+    table = model.__table__
+    statement = table.update().values(**live_counters(model, key, now))
+    if ids is not None:
+        statement = statement.where(table.c.id.in_(ids))
+    if stale_only:
+        statement = statement.where(table.c.next_show_time <= now)
+    return connection.execute(statement).rowcount
+
+
+def count_show(connection, venue_id, artist_id, start_time, step, now=None):
+    """Add (step 1) or remove (step -1) a show on its venue and artist.
+
+    One UPDATE per owner, which also bumps its version.
+    """
+    now = now or datetime.now()
+    for (model, key), owner_id in zip(SHOW_OWNERS, (venue_id, artist_id)):
+        table = model.__table__
+        values = {'version': table.c.version + 1, 'updated_at': now}
+        if start_time > now:
+            next_show = table.c.next_show_time
+            if step > 0:
+                values['next_show_time'] = case(
+                    (or_(next_show.is_(None), next_show > start_time), start_time),
+                    else_=next_show)
+            else:
+                values['next_show_time'] = case(
+                    (next_show == start_time, live_counters(model, key, now)['next_show_time']),
+                    else_=next_show)
+            values['upcoming_shows_count'] = table.c.upcoming_shows_count + step
+        else:
+            values['past_shows_count'] = table.c.past_shows_count + step
+        connection.execute(table.update().where(table.c.id == owner_id).values(**values))
+
+
+@event.listens_for(Show, 'after_insert')
+def count_inserted_show(mapper, connection, target):
+    count_show(connection, target.venue_id, target.artist_id, target.start_time, 1)
+
+
+@event.listens_for(Show, 'after_delete')
+def count_deleted_show(mapper, connection, target):
+    count_show(connection, target.venue_id, target.artist_id, target.start_time, -1)
+
+
+@event.listens_for(Show, 'after_update')
+def count_moved_show(mapper, connection, target):
+    if not columns_changed(mapper, target):
+        return
+    # Take the show off its old venue/artist/time and put it on the new ones.
+    state = inspect(target)
+    old = [state.attrs[key].history.deleted[0] if state.attrs[key].history.deleted
+           else getattr(target, key) for key in ('venue_id', 'artist_id', 'start_time')]
+    count_show(connection, *old, -1)
+    count_show(connection, target.venue_id, target.artist_id, target.start_time, 1)
+
+
+#----------------------------------------------------------------------------#
+# Genre links.
+#
+# Venue.genres (a list) and Artist.genres (a joined string) remain what the
+# forms, pages and API read and write. The hooks below mirror them into the
+# venue_genres / artist_genres link tables, indexed both ways, and keep the
+# per-genre venue and artist counts on genres in step (see genres.py).
+#----------------------------------------------------------------------------#
+
+GENRE_LINKS = {
+    Venue: (venue_genres, 'venue_id', 'venue_count'),
+    Artist: (artist_genres, 'artist_id', 'artist_count'),
+}
+
+
+def genre_names(genres):
+    """The distinct genre names of a Venue.genres list or an Artist.genres string."""
+    if isinstance(genres, str):
+        # Older artist edits joined with '.' instead of ','.
+        genres = re.split(r'[,.]', genres)
+    return sorted({name.strip() for name in genres or () if name and name.strip()})
+
+
+def genre_ids(connection, names):
+    """{name: id} for ``names``, creating the genres that do not exist yet."""
+    table = Genre.__table__
+    names = set(names)
+    if not names:
+        return {}
+    found = dict(connection.execute(
+        select(table.c.name, table.c.id).where(table.c.name.in_(names))).all())
+    missing = names - found.keys()
+    if missing:
+        connection.execute(table.insert(), [{'name': name} for name in sorted(missing)])
+        found.update(connection.execute(
+            select(table.c.name, table.c.id).where(table.c.name.in_(missing))).all())
+    return found
+
+
+def link_genres(connection, model, rows):
+    """Point the genre links of ``rows``, ``(id, genres)`` pairs, at their genres.
+
+    Only the links that changed are written, and the genre counts move by
+    the same amount; a handful of statements however many rows.
+    """
+    links, key, count = GENRE_LINKS[model]
+    names = {id: genre_names(genres) for id, genres in rows}
+    if not names:
+        return
+    ids = genre_ids(connection, {name for owned in names.values() for name in owned})
+    wanted = {(id, ids[name]) for id, owned in names.items() for name in owned}
+    current = set(connection.execute(
+        select(links.c[key], links.c.genre_id).where(links.c[key].in_(names))).all())
+
+    removed, added = current - wanted, wanted - current
+    if removed:
+        connection.execute(links.delete().where(
+            tuple_(links.c[key], links.c.genre_id).in_(sorted(removed))))
+    if added:
+        connection.execute(links.insert(), [{key: id, 'genre_id': genre_id}
+                                            for id, genre_id in sorted(added)])
+
+    delta = Counter(genre_id for _, genre_id in added)
+    delta.subtract(genre_id for _, genre_id in removed)
+    delta = {genre_id: n for genre_id, n in delta.items() if n}
+    if delta:
+        table = Genre.__table__
+        step = case(*((table.c.id == genre_id, n) for genre_id, n in delta.items()), else_=0)
+        connection.execute(table.update().where(table.c.id.in_(delta))
+                           .values({count: table.c[count] + step}))
+
+
+@event.listens_for(Venue, 'after_insert')
+@event.listens_for(Artist, 'after_insert')
+def link_inserted_genres(mapper, connection, target):
+    link_genres(connection, type(target), [(target.id, target.genres)])
+
+
+@event.listens_for(Venue, 'after_update')
+@event.listens_for(Artist, 'after_update')
+def link_updated_genres(mapper, connection, target):
+    if inspect(target).attrs.genres.history.has_changes():
+        link_genres(connection, type(target), [(target.id, target.genres)])
+
+
+@event.listens_for(Venue, 'before_delete')
+@event.listens_for(Artist, 'before_delete')
+def unlink_deleted_genres(mapper, connection, target):
+    link_genres(connection, type(target), [(target.id, None)])
@@ -0,0 +1,56 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+#----------------------------------------------------------------------------#
+# Keyset pagination.
+#----------------------------------------------------------------------------#
+
+
+def encode_cursor(values):
+    """Pack the sort-key values of the last row on a page into a URL-safe token."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    token = urlsafe_b64encode(json.dumps(payload).encode('utf-8'))
+    return token.decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, types):
+    """Unpack a token made by ``encode_cursor``; raises ValueError if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(urlsafe_b64decode(padded.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f'invalid cursor {token!r}') from e
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise ValueError(f'invalid cursor {token!r}')
+    values = []
+    for value, kind in zip(payload, types):
+        if kind is datetime:
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, kind):
+            value = kind(value)
+        values.append(value)
+    return tuple(values)
+
+
+def keyset_page(query, keys, after=None, limit=50, descending=False):
+    """Return one page of ``query`` ordered by ``keys`` plus the next cursor values.
+
+    ``keys`` must be selected by ``query`` and together be unique (end them
+    with a primary key). The bound is a row-value comparison so the database
+    can seek straight to the page on a matching composite index instead of
+    skipping ``OFFSET`` rows.
+    """
+    if after is not None:
+        bound = tuple_(*keys) < tuple(after) if descending else tuple_(*keys) > tuple(after)
+        query = query.filter(bound)
+    order = [key.desc() for key in keys] if descending else list(keys)
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_after = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_after = tuple(rows[-1]._mapping[key] for key in keys)
+    return rows, next_after
@@ -0,0 +1,118 @@
+import os
+import threading
+import time
+from collections import deque
+
+from flask import jsonify
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from models import db
+
+#----------------------------------------------------------------------------#
+# Connection pool telemetry.
+#
+# TimedQueuePool is a QueuePool that times every checkout and counts the ones
+# that time out. Numbers are per worker process; size pools by looking at
+# each worker's wait times and overflow under load.
+#----------------------------------------------------------------------------#
+
+
+class PoolTelemetry:
+
+    def __init__(self, samples=1024):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = deque(maxlen=samples)
+        self.slow_wait = 0.1
+        self.logger = None
+        self._lock = threading.Lock()
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.waits.append(waited)
+            if timed_out:
+                self.timeouts += 1
+            elif waited >= self.slow_wait:
+                self.slow_checkouts += 1
+        if self.logger is not None:
+            if timed_out:
+                self.logger.error('db pool: checkout timed out after %.0f ms',
+                                  waited * 1000)
+            elif waited >= self.slow_wait:
+                self.logger.warning('db pool: checkout waited %.0f ms',
+                                    waited * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self.waits)
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'wait_ms_avg': 1000 * self.wait_total / self.checkouts if self.checkouts else 0.0,
+                'wait_ms_p95': 1000 * waits[int(len(waits) * 0.95)] if waits else 0.0,
+                'wait_ms_max': 1000 * self.wait_max,
+            }
+
+
+telemetry = PoolTelemetry()
+
+
+class TimedQueuePool(QueuePool):
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            telemetry.record(time.perf_counter() - started, timed_out=True)
+            raise
+        telemetry.record(time.perf_counter() - started)
+        return connection
+
+
+def pool_stats():
+    pool = db.engine.pool
+    stats = {'pid': os.getpid(), 'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+        })
+    stats.update(telemetry.snapshot())
+    return stats
+
+
+def init_app(app):
+    """Install the timed pool; must run before ``db.init_app(app)``."""
+    app.config.setdefault('STATS_ENDPOINTS', app.debug)
+    options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    if 'pool_size' in options:
+        options.setdefault('poolclass', TimedQueuePool)
+    telemetry.logger = app.logger
+    telemetry.slow_wait = app.config.get('POOL_SLOW_WAIT_MS', 100) / 1000
+
+    interval = app.config.get('POOL_STATS_LOG_INTERVAL', 0)
+    last_logged = [time.monotonic()]
+
+    @app.after_request
+    def log_pool_stats(response):
+        if interval and time.monotonic() - last_logged[0] >= interval:
+            last_logged[0] = time.monotonic()
+            app.logger.info('db pool: %s', pool_stats())
+        return response
+
+    def pool_stats_view():
+        return jsonify(pool_stats())
+
+    if app.config['STATS_ENDPOINTS']:
+        app.add_url_rule('/pool/stats', view_func=pool_stats_view)
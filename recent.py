@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import deque
+
+from flask import current_app, jsonify
+
+from models import db, Artist, Venue
+
+#----------------------------------------------------------------------------#
+# Recently listed.
+#
+# Each process keeps the latest RECENT_LISTINGS_SIZE venues and artists in
+# a bounded deque, newest first, so the home page renders without a query.
+# Like autocomplete, the lists are loaded on first use (one
+# ``ORDER BY created_date DESC, id DESC LIMIT n`` each) and kept current by
+# the create/edit/delete handlers in app.py; listings made by other
+# processes (or bulk imports) show up once a list is older than
+# RECENT_LISTINGS_MAX_AGE seconds and reloads.
+#----------------------------------------------------------------------------#
+
+
+class RecentList:
+
+    def __init__(self, model, size=10):
+        self.model = model
+        self.size = size
+        self.loaded_at = None
+        self.max_age = None
+        self._entries = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def load(self):
+        started = time.perf_counter()
+        rows = db.session.query(self.model.id, self.model.name) \
+            .order_by(self.model.created_date.desc(), self.model.id.desc()) \
+            .limit(self.size).all()
+        with self._lock:
+            self._entries = deque(rows, maxlen=self.size)
+            self.loaded_at = time.monotonic()
+        current_app.logger.info(
+            'recent: loaded %d %s in %.0f ms', len(rows), self.model.__tablename__,
+            (time.perf_counter() - started) * 1000)
+
+    def ensure_loaded(self):
+        if self.loaded_at is None or (
+                self.max_age and time.monotonic() - self.loaded_at > self.max_age):
+            self.load()
+
+    def push(self, id, name):
+        """Put a just-created row at the front, dropping the oldest if full."""
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            self._entries = deque(
+                (entry for entry in self._entries if entry[0] != id), maxlen=self.size)
+            self._entries.appendleft((id, name))
+
+    def put(self, id, name):
+        """Rename a listed row; rows not in the list are left out."""
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            self._entries = deque(
+                ((id, name) if entry[0] == id else entry for entry in self._entries),
+                maxlen=self.size)
+
+    def remove(self, id):
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            if any(entry[0] == id for entry in self._entries):
+                # The next newest row takes its place; reload to find it.
+                self.loaded_at = None
+
+    def latest(self):
+        """``[{'id', 'name'}]``, newest first."""
+        with self._lock:
+            return [{'id': id, 'name': name} for id, name in self._entries]
+
+    def stats(self):
+        loaded = self.loaded_at is not None
+        return {
+            'loaded': loaded,
+            'age_seconds': round(time.monotonic() - self.loaded_at, 1) if loaded else None,
+            'size': self.size,
+            'entries': len(self._entries),
+        }
+
+
+venues = RecentList(Venue)
+artists = RecentList(Artist)
+LISTS = {'venues': venues, 'artists': artists}
+
+
+def init_app(app):
+    app.config.setdefault('RECENT_LISTINGS_SIZE', 10)
+    app.config.setdefault('RECENT_LISTINGS_MAX_AGE', 60)
+    app.config.setdefault('STATS_ENDPOINTS', app.debug)
+    for recent in LISTS.values():
+        recent.size = app.config['RECENT_LISTINGS_SIZE']
+        recent.max_age = app.config['RECENT_LISTINGS_MAX_AGE']
+
+    def recent_stats():
+        return jsonify({kind: recent.stats() for kind, recent in LISTS.items()})
+
+    if app.config['STATS_ENDPOINTS']:
+        app.add_url_rule('/recent/stats', view_func=recent_stats)
@@ -0,0 +1,59 @@
+import os
+import tempfile
+from datetime import date, datetime
+from functools import lru_cache
+
+import dateutil.parser
+from babel import Locale
+from babel.dates import parse_pattern
+from jinja2 import FileSystemBytecodeCache
+
+#----------------------------------------------------------------------------#
+# Template rendering.
+#
+# The ``datetime`` filter formats datetimes straight from the loaders (only
+# strings go through dateutil) with Babel patterns compiled once per format.
+# Compiled templates are kept in a Jinja bytecode cache on disk so a fresh
+# worker loads them instead of compiling, and every template is loaded at
+# startup so the first request for a page does not pay for it either.
+#----------------------------------------------------------------------------#
+
+DATETIME_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+LOCALE = Locale.parse('en')
+
+
+@lru_cache(maxsize=32)
+def datetime_pattern(format):
+    return parse_pattern(DATETIME_FORMATS.get(format, format))
+
+
+def format_datetime(value, format='medium'):
+    if not isinstance(value, (datetime, date)):
+        value = dateutil.parser.parse(value)
+    return datetime_pattern(format).apply(value, LOCALE)
+
+
+def precompile(env):
+    """Load every HTML template into the environment's cache; returns how many."""
+    names = env.list_templates(filter_func=lambda name: name.endswith('.html'))
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+
+def init_app(app):
+    app.config.setdefault('TEMPLATE_BYTECODE_CACHE_DIR',
+                          os.path.join(tempfile.gettempdir(), 'fyyur-jinja'))
+    app.config.setdefault('TEMPLATE_PRECOMPILE', True)
+
+    app.jinja_env.filters['datetime'] = format_datetime
+    cache_dir = app.config['TEMPLATE_BYTECODE_CACHE_DIR']
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    if app.config['TEMPLATE_PRECOMPILE']:
+        precompile(app.jinja_env)
@@ -0,0 +1,142 @@
+import random
+import threading
+import time
+
+from flask import g, has_request_context, jsonify, make_response, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc
+
+#----------------------------------------------------------------------------#
+# Read replicas.
+#
+# Every bind in SQLALCHEMY_BINDS named replica_* is a read replica of the
+# primary. Requests to an endpoint (or blueprint) in REPLICA_ENDPOINTS read
+# from a randomly chosen healthy replica; everything else, every flush and
+# every INSERT/UPDATE/DELETE uses the primary, and once a request has
+# written, its remaining reads do too.
+#
+# Read-your-writes: a response to a request that wrote sets a cookie that
+# sends the same client's reads to the primary for REPLICA_STICKY_SECONDS,
+# longer than replication normally lags.
+#
+# Failover: a replica that fails to connect or drops its connection is left
+# out for REPLICA_RETRY_SECONDS, and the failed request is run again on the
+# primary. Routed views must therefore be read-only.
+#----------------------------------------------------------------------------#
+
+BIND_PREFIX = 'replica_'
+STICKY_COOKIE = 'db_primary_until'
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends a routed request's reads to ``g.db_replica``."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g.db_wrote = True
+            elif g.get('db_replica') and not g.get('db_wrote'):
+                return self._db.engines[g.db_replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaSet:
+
+    def __init__(self, names, retry_after):
+        self.names = list(names)
+        self.retry_after = retry_after
+        self.down_until = {}
+        self.failures = dict.fromkeys(self.names, 0)
+        self.lock = threading.Lock()
+
+    def choose(self):
+        """A healthy replica's bind key, or None when the primary must serve."""
+        now = time.monotonic()
+        healthy = [name for name in self.names if self.down_until.get(name, 0) <= now]
+        return random.choice(healthy) if healthy else None
+
+    def mark_down(self, name):
+        with self.lock:
+            self.down_until[name] = time.monotonic() + self.retry_after
+            self.failures[name] += 1
+
+    def stats(self):
+        now = time.monotonic()
+        return {name: {'healthy': self.down_until.get(name, 0) <= now,
+                       'failures': self.failures[name]}
+                for name in self.names}
+
+
+def reads_primary():
+    """Whether this request must read its own writes: it wrote, or its client just did."""
+    if g.get('db_wrote'):
+        return True
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def init_app(app):
+    """Route reads to replicas; must run after ``db.init_app(app)``."""
+    app.config.setdefault('REPLICA_ENDPOINTS', ())
+    app.config.setdefault('REPLICA_STICKY_SECONDS', 10)
+    app.config.setdefault('REPLICA_RETRY_SECONDS', 30)
+    app.config.setdefault('STATS_ENDPOINTS', app.debug)
+
+    db = app.extensions['sqlalchemy']
+    names = sorted(key for key in app.config.get('SQLALCHEMY_BINDS') or {}
+                   if key.startswith(BIND_PREFIX))
+    replicas = ReplicaSet(names, app.config['REPLICA_RETRY_SECONDS'])
+    app.extensions['replicas'] = replicas
+    if not names:
+        return
+
+    routed = frozenset(app.config['REPLICA_ENDPOINTS'])
+    sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+
+    with app.app_context():
+        for name in names:
+            _watch(db.engines[name], name, replicas)
+
+    @app.before_request
+    def choose_replica():
+        if request.endpoint not in routed and request.blueprint not in routed:
+            return
+        if not reads_primary():
+            g.db_replica = replicas.choose()
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('db_wrote'):
+            response.set_cookie(STICKY_COOKIE, str(int(time.time()) + sticky_seconds),
+                                max_age=sticky_seconds, httponly=True, samesite='Lax')
+        if app.config.get('SQL_DEBUG_HEADERS'):
+            response.headers['X-DB-Bind'] = g.get('db_replica') or 'primary'
+        return response
+
+    @app.errorhandler(exc.DBAPIError)
+    def replica_failed(error):
+        if not g.pop('db_replica_failed', False):
+            raise error
+        app.logger.warning('db replica %s failed, retrying on the primary: %s',
+                           g.db_replica, error.orig)
+        db.session.rollback()
+        g.db_replica = None
+        return make_response(app.view_functions[request.endpoint](**request.view_args))
+
+    def replica_stats():
+        return jsonify(replicas.stats())
+
+    if app.config['STATS_ENDPOINTS']:
+        app.add_url_rule('/replicas/stats', view_func=replica_stats)
+
+
+def _watch(engine, name, replicas):
+    @event.listens_for(engine, 'handle_error')
+    def mark_down(context):
+        # No connection means the connect itself failed.
+        if context.connection is None or context.is_disconnect:
+            replicas.mark_down(name)
+            if has_request_context() and g.get('db_replica') == name:
+                g.db_replica_failed = True
@@ -0,0 +1,158 @@
+import sys
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy import func, select
+
+from exporter import ROWS_PER_CHUNK, encoded, row_chunks
+from genres import has_genre
+from models import db, Artist, Venue, Show
+
+#----------------------------------------------------------------------------#
+# Show calendar.
+#
+# The shows starting in a [start, end) window, oldest first, optionally
+# narrowed to a venue, an artist, a city (and state) or an artist genre,
+# plus per-day or per-week counts of the same shows for calendar heatmaps.
+#
+#   GET /api/v1/calendar          ?from=&to=&venue_id=&artist_id=&city=&state=&genre=
+#   GET /api/v1/calendar/buckets  ?from=&to=&by=day|week&...
+#   flask calendar shows --from 2026-10-23 --to 2026-10-26 --city Austin
+#   flask calendar buckets --from 2026-10-01 --to 2027-01-01 --by week
+#
+# Window scans use the (venue_id, start_time) or (artist_id, start_time)
+# index when filtered by venue or artist, and otherwise the start_time
+# indexes: the (start_time, id) B-tree, and on Postgres a BRIN index, which
+# is a few pages however many shows and works well while shows are
+# inserted roughly in start_time order. Shows come off a server-side cursor
+# (``yield_per``) so a wide window streams in constant memory. Buckets are
+# one GROUP BY over the same window; empty days or weeks are filled in.
+#----------------------------------------------------------------------------#
+
+CALENDAR_FIELDS = ('id', 'start_time', 'end_time', 'venue_id', 'venue_name', 'city',
+                   'state', 'artist_id', 'artist_name')
+BUCKETS = ('day', 'week')
+
+
+def calendar_query(start, end, venue_id=None, artist_id=None, city=None, state=None,
+                   genre=None):
+    """The shows starting in [start, end) as CALENDAR_FIELDS rows, by (start_time, id)."""
+    query = (
+        select(Show.id, Show.start_time, Show.end_time, Show.venue_id,
+               Venue.name, Venue.city, Venue.state, Show.artist_id, Artist.name)
+        .join(Venue, Venue.id == Show.venue_id)
+        .join(Artist, Artist.id == Show.artist_id)
+        .order_by(Show.start_time, Show.id)
+    )
+    return _narrow(query, start, end, venue_id, artist_id, city, state, genre)
+
+
+def _narrow(query, start, end, venue_id, artist_id, city, state, genre):
+    query = query.where(Show.start_time >= start, Show.start_time < end)
+    if venue_id is not None:
+        query = query.where(Show.venue_id == venue_id)
+    if artist_id is not None:
+        query = query.where(Show.artist_id == artist_id)
+    if city:
+        query = query.where(Venue.city == city)
+    if state:
+        query = query.where(Venue.state == state)
+    if genre:
+        query = query.where(has_genre(Artist, genre))
+    return query
+
+
+def calendar_rows(start, end, **filters):
+    """Stream the rows of ``calendar_query`` ROWS_PER_CHUNK at a time."""
+    return db.session.execute(calendar_query(start, end, **filters),
+                              execution_options={'yield_per': ROWS_PER_CHUNK})
+
+
+def calendar_chunks(start, end, fmt='ndjson', **filters):
+    """The window as CSV or NDJSON text chunks, like an export."""
+    return row_chunks(CALENDAR_FIELDS, calendar_rows(start, end, **filters), fmt)
+
+
+def bucket_start(value, by):
+    """The first day of the day or (Monday-based) week ``value`` falls in."""
+    day = value if type(value) is date else value.date()
+    return day - timedelta(days=day.weekday()) if by == 'week' else day
+
+
+def _bucket_column(by):
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.date_trunc(by, Show.start_time)
+    if by == 'week':
+        # The Sunday ending the week, less six days.
+        return func.date(Show.start_time, 'weekday 0', '-6 days')
+    return func.date(Show.start_time)
+
+
+def calendar_buckets(start, end, by='day', venue_id=None, artist_id=None, city=None,
+                     state=None, genre=None):
+    """``[{'start', 'count'}]`` for every day or week from ``start`` up to ``end``."""
+    bucket = _bucket_column(by).label('bucket')
+    query = select(bucket, func.count()).select_from(Show)
+    if city or state:
+        query = query.join(Venue, Venue.id == Show.venue_id)
+    if genre:
+        query = query.join(Artist, Artist.id == Show.artist_id)
+    query = _narrow(query, start, end, venue_id, artist_id, city, state, genre) \
+        .group_by(bucket)
+    counts = {}
+    for value, count in db.session.execute(query):
+        # SQLite hands back 'YYYY-MM-DD' strings, Postgres datetimes.
+        counts[bucket_start(date.fromisoformat(value) if isinstance(value, str) else value,
+                            by)] = count
+    step = timedelta(days=7 if by == 'week' else 1)
+    day, buckets = bucket_start(start, by), []
+    while datetime.combine(day, datetime.min.time()) < end:
+        buckets.append({'start': day, 'count': counts.get(day, 0)})
+        day += step
+    return buckets
+
+
+def init_app(app):
+    app.config.setdefault('CALENDAR_MAX_DAYS', 366)
+
+    @app.cli.group('calendar')
+    def calendar_command():
+        """Shows in a time window."""
+
+    def window_options(command):
+        for option in reversed((
+                click.option('--from', 'start', type=click.DateTime(), required=True,
+                             help='Shows starting at or after.'),
+                click.option('--to', 'end', type=click.DateTime(), required=True,
+                             help='Shows starting before.'),
+                click.option('--venue-id', type=int),
+                click.option('--artist-id', type=int),
+                click.option('--city'),
+                click.option('--state'),
+                click.option('--genre', help="An artist's genre."))):
+            command = option(command)
+        return command
+
+    @calendar_command.command('shows')
+    @window_options
+    @click.option('--format', 'fmt', type=click.Choice(('csv', 'ndjson')), default='csv',
+                  show_default=True)
+    @click.option('-o', '--output', type=click.Path(dir_okay=False),
+                  help='Write here instead of stdout.')
+    def shows_command(start, end, fmt, output, **filters):
+        """Stream the shows starting in a window, oldest first."""
+        out = open(output, 'wb') if output else sys.stdout.buffer
+        try:
+            for data in encoded(calendar_chunks(start, end, fmt, **filters)):
+                out.write(data)
+        finally:
+            if output:
+                out.close()
+
+    @calendar_command.command('buckets')
+    @window_options
+    @click.option('--by', type=click.Choice(BUCKETS), default='day', show_default=True)
+    def buckets_command(start, end, by, **filters):
+        """Count the shows starting in each day or week of a window."""
+        for bucket in calendar_buckets(start, end, by, **filters):
+            click.echo(f"{bucket['start']:%Y-%m-%d}\t{bucket['count']}")
@@ -0,0 +1,166 @@
+import re
+from datetime import datetime
+
+import click
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+
+from counters import show_counts
+from genres import genre_facets, has_genre, matched_genre_facets
+from models import db, Artist, Venue
+
+#----------------------------------------------------------------------------#
+# Search.
+#
+# Venues and artists keep a lower-cased ``search_document`` (name, city,
+# state and genres) maintained by the model hooks in models.py. Every search
+# is one statement returning the ranked hits, the total number of matches
+# (as a window count) and each hit's stored upcoming show count; genre
+# facets over all the matches, when asked for, take a second.
+#
+#   postgresql  pg_trgm GIN index (substring matches) plus a GIN index on
+#               to_tsvector('simple', ...) for word-prefix matches, ranked by
+#               name similarity and ts_rank.
+#   sqlite      FTS5 tables kept in sync by triggers, ranked by bm25.
+#               Install them with ``flask search install``.
+#   others      unindexed ILIKE, for completeness.
+#----------------------------------------------------------------------------#
+
+FTS_TABLES = {
+    Venue.__tablename__: 'venues_fts',
+    Artist.__tablename__: 'artists_fts',
+}
+
+
+def search_terms(search_term):
+    return re.findall(r'\w+', (search_term or '').lower())
+
+
+def _document_vector(model):
+    # Spelled exactly like the expression index in the migration so the
+    # planner can match it.
+    return literal_column("to_tsvector('simple', coalesce("
+                          f"{model.__tablename__}.search_document, ''))")
+
+
+def _postgresql_match(model, search_term, terms):
+    query = func.to_tsquery(literal_column("'simple'"),
+                            ' & '.join(f'{term}:*' for term in terms))
+    pattern = '%' + search_term.lower().replace('\\', '\\\\') \
+        .replace('%', '\\%').replace('_', '\\_') + '%'
+    vector = _document_vector(model)
+    match = or_(model.search_document.like(pattern), vector.op('@@')(query))
+    rank = func.similarity(model.name, search_term) + func.ts_rank(vector, query)
+    return None, match, rank.desc()
+
+
+def _sqlite_match(model, search_term, terms):
+    fts_table = FTS_TABLES[model.__tablename__]
+    fts = table(fts_table, column('rowid'))
+    query = ' AND '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+    # bm25() is only usable in the statement that runs the MATCH, so rank
+    # the hits in a subquery and join them back to the model.
+    hits = (
+        select(fts.c.rowid, literal_column(f'bm25({fts_table})').label('rank'))
+        .where(text(f'{fts_table} MATCH :fts_query').bindparams(fts_query=query))
+        .subquery()
+    )
+    return (hits, hits.c.rowid == model.id), None, hits.c.rank
+
+
+def _generic_match(model, search_term, terms):
+    match = model.search_document.ilike(f'%{search_term}%')
+    return None, match, model.name
+
+
+BACKENDS = {
+    'postgresql': _postgresql_match,
+    'sqlite': _sqlite_match,
+}
+
+
+def _search(model, search_term, limit, now, genre=None, facets=False):
+    now = now or datetime.now()
+    search_term = (search_term or '').strip()
+    terms = search_terms(search_term)
+
+    num_upcoming_shows, _ = show_counts(model, now)
+    query = db.session.query(model.id, model.name, num_upcoming_shows,
+                             func.count().over().label('total'))
+    order = [model.id]
+    if terms:
+        dialect = db.session.get_bind().dialect.name
+        join, match, rank = BACKENDS.get(dialect, _generic_match)(
+            model, search_term, terms)
+        if join is not None:
+            query = query.select_from(model).join(*join)
+        if match is not None:
+            query = query.filter(match)
+        order.insert(0, rank)
+    # Facets count all the matches whatever the genre, so others can be picked.
+    matched = query.with_entities(model.id).subquery() if terms else None
+    if genre:
+        query = query.filter(has_genre(model, genre))
+
+    rows = query.order_by(*order).limit(limit).all()
+    results = {
+        'count': rows[0].total if rows else 0,
+        'data': [{
+            'id': row.id,
+            'name': row.name,
+            'num_upcoming_shows': row.num_upcoming_shows,
+        } for row in rows],
+    }
+    if facets:
+        results['facets'] = genre_facets(model) if matched is None else \
+            matched_genre_facets(model, select(matched.c.id))
+    return results
+
+
+def search_venues(search_term, limit=50, now=None, genre=None, facets=False):
+    return _search(Venue, search_term, limit, now, genre, facets)
+
+
+def search_artists(search_term, limit=50, now=None, genre=None, facets=False):
+    return _search(Artist, search_term, limit, now, genre, facets)
+
+#----------------------------------------------------------------------------#
+# SQLite full-text tables.
+#----------------------------------------------------------------------------#
+
+
+def install_sqlite_fts(connection):
+    """Create the FTS5 tables and sync triggers, then index existing rows."""
+    for source, fts_table in FTS_TABLES.items():
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+            f"search_document, content='{source}', content_rowid='id')",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {fts_table}(rowid, search_document) "
+            f"VALUES (new.id, new.search_document); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {source} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, search_document) "
+            f"VALUES ('delete', old.id, old.search_document); END",
+            f"CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE ON {source} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, search_document) "
+            f"VALUES ('delete', old.id, old.search_document); "
+            f"INSERT INTO {fts_table}(rowid, search_document) "
+            f"VALUES (new.id, new.search_document); END",
+            f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')",
+        ]
+        for statement in statements:
+            connection.execute(text(statement))
+
+
+def init_app(app):
+    @app.cli.group()
+    def search():
+        """Search index maintenance."""
+
+    @search.command('install')
+    def install():
+        """Create the SQLite FTS5 search tables (Postgres uses migrations)."""
+        if db.engine.dialect.name != 'sqlite':
+            raise click.UsageError('only needed on SQLite; run `flask db upgrade`')
+        with db.engine.begin() as connection:
+            install_sqlite_fts(connection)
+        click.echo('search tables installed')
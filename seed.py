@@ -0,0 +1,221 @@
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import click
+
+from genres import backfill as link_all_genres
+from models import (db, Artist, Venue, Show, SHOW_OWNERS, build_search_document,
+                    refresh_counters)
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#
+# ``flask seed --venues 10000 --artists 20000 --shows 1000000`` fills the
+# configured database with a reproducible dataset for benchmarking. Cities
+# and genres follow a Zipf-like skew (a few big markets, a long tail) and
+# show times are spread a year either side of now. Rows go in as batched
+# executemany inserts, so the model hooks do not run: the search document
+# is computed here, genres are linked once the venues and artists are in
+# and the show counters are recounted at the end. Shows are laid out so no
+# venue or artist is double-booked.
+#----------------------------------------------------------------------------#
+
+CITIES = [
+    ('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'),
+    ('Houston', 'TX'), ('Phoenix', 'AZ'), ('Philadelphia', 'PA'),
+    ('San Antonio', 'TX'), ('San Diego', 'CA'), ('Dallas', 'TX'),
+    ('Austin', 'TX'), ('San Jose', 'CA'), ('Jacksonville', 'FL'),
+    ('Columbus', 'OH'), ('Charlotte', 'NC'), ('San Francisco', 'CA'),
+    ('Indianapolis', 'IN'), ('Seattle', 'WA'), ('Denver', 'CO'),
+    ('Washington', 'DC'), ('Boston', 'MA'), ('Nashville', 'TN'),
+    ('Detroit', 'MI'), ('Portland', 'OR'), ('Las Vegas', 'NV'),
+    ('Memphis', 'TN'), ('Louisville', 'KY'), ('Baltimore', 'MD'),
+    ('Milwaukee', 'WI'), ('Albuquerque', 'NM'), ('Atlanta', 'GA'),
+    ('Kansas City', 'MO'), ('Miami', 'FL'), ('Minneapolis', 'MN'),
+    ('New Orleans', 'LA'), ('Cleveland', 'OH'), ('Tampa', 'FL'),
+    ('Pittsburgh', 'PA'), ('Salt Lake City', 'UT'), ('Richmond', 'VA'),
+    ('Birmingham', 'AL'), ('Boise', 'ID'), ('Des Moines', 'IA'),
+    ('Anchorage', 'AK'), ('Honolulu', 'HI'), ('Providence', 'RI'),
+    ('Burlington', 'VT'), ('Omaha', 'NE'), ('Wichita', 'KS'),
+]
+
+GENRES = [
+    'Rock n Roll', 'Pop', 'Hip-Hop', 'Jazz', 'Alternative', 'Electronic',
+    'Country', 'R&B', 'Blues', 'Folk', 'Punk', 'Soul', 'Reggae', 'Funk',
+    'Classical', 'Heavy Metal', 'Instrumental', 'Musical Theatre', 'Other',
+]
+
+VENUE_WORDS = ['The', 'Blue', 'Red', 'Golden', 'Velvet', 'Electric', 'Iron',
+               'Silver', 'Old', 'Little', 'Grand', 'Crystal', 'Union', 'Rusty',
+               'Midnight', 'Neon', 'Copper', 'Lucky', 'Wild', 'Royal']
+VENUE_KINDS = ['Room', 'Hall', 'Lounge', 'Club', 'Tavern', 'Theatre', 'Bar',
+               'Ballroom', 'Garden', 'Cellar', 'Pavilion', 'Saloon', 'Loft']
+ARTIST_WORDS = ['Wild', 'Sabbath', 'Electric', 'Lonely', 'Velvet', 'Neon',
+                'Howling', 'Golden', 'Broken', 'Static', 'Silver', 'Paper',
+                'Crimson', 'Hollow', 'Atomic', 'Gentle', 'Burning', 'Glass']
+ARTIST_NOUNS = ['Wolves', 'Sons', 'Lights', 'Hearts', 'Machines', 'Rivers',
+                'Ghosts', 'Kings', 'Tigers', 'Echoes', 'Saints', 'Engines',
+                'Daughters', 'Foxes', 'Comets', 'Strangers']
+
+
+def zipf_weights(n, s=1.1):
+    """Cumulative weights, so each ``choices`` call is a bisect, not a sum."""
+    return list(accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def venue_rows(rng, count, now):
+    city_weights = zipf_weights(len(CITIES))
+    genre_weights = zipf_weights(len(GENRES), 0.8)
+    for n in range(count):
+        city, state = rng.choices(CITIES, cum_weights=city_weights)[0]
+        name = f'{rng.choice(VENUE_WORDS)} {rng.choice(VENUE_WORDS)} {rng.choice(VENUE_KINDS)} {n}'
+        genres = sorted(set(rng.choices(GENRES, cum_weights=genre_weights, k=rng.randint(1, 3))))
+        yield {
+            'name': name,
+            'city': city,
+            'state': state,
+            'address': f'{rng.randint(1, 9999)} {rng.choice(VENUE_WORDS)} St',
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            'image_link': f'https://images.example.com/venues/{n}.jpg',
+            'facebook_link': f'https://www.facebook.com/venue{n}',
+            'website': f'https://venue{n}.example.com',
+            'seeking_talent': rng.random() < 0.4,
+            'seeking_description': 'Looking for local acts on weekends.',
+            'genres': genres,
+            'created_date': now - timedelta(minutes=rng.randint(0, 525600)),
+            'search_document': build_search_document(name, city, state, genres),
+        }
+
+
+def artist_rows(rng, count, now):
+    city_weights = zipf_weights(len(CITIES))
+    genre_weights = zipf_weights(len(GENRES), 0.8)
+    for n in range(count):
+        city, state = rng.choices(CITIES, cum_weights=city_weights)[0]
+        name = f'{rng.choice(ARTIST_WORDS)} {rng.choice(ARTIST_NOUNS)} {n}'
+        genres = ','.join(sorted(set(rng.choices(GENRES, cum_weights=genre_weights, k=rng.randint(1, 2)))))
+        yield {
+            'name': name,
+            'city': city,
+            'state': state,
+            'phone': f'{rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}',
+            'website': f'https://artist{n}.example.com',
+            'genres': genres,
+            'image_link': f'https://images.example.com/artists/{n}.jpg',
+            'facebook_link': f'https://www.facebook.com/artist{n}',
+            'seeking_venue': rng.random() < 0.5,
+            'seeking_description': 'Touring this season.',
+            'created_date': now - timedelta(minutes=rng.randint(0, 525600)),
+            'search_document': build_search_document(name, city, state, genres),
+        }
+
+
+# Shows start on the hour in one of these daily slots and run for at most
+# 150 minutes, so shows in different slots never overlap.
+SHOW_SLOT_HOURS = (13, 16, 19, 22)
+SHOW_DAYS = range(-365, 366)
+
+
+class Bitmap:
+
+    def __init__(self, size):
+        self.bits = bytearray((size + 7) // 8)
+
+    def __contains__(self, index):
+        return self.bits[index >> 3] & (1 << (index & 7))
+
+    def add(self, index):
+        self.bits[index >> 3] |= 1 << (index & 7)
+
+
+def show_rows(rng, count, venue_ids, artist_ids, now, tries=50):
+    # Popular venues and artists book far more shows than the long tail.
+    # Neither plays two shows in one slot, so the data holds no double
+    # bookings; a show whose venue and artist are not free together after
+    # ``tries`` draws is left out.
+    venue_weights = zipf_weights(len(venue_ids), 0.7)
+    artist_weights = zipf_weights(len(artist_ids), 0.7)
+    venues, artists = range(len(venue_ids)), range(len(artist_ids))
+    slots = len(SHOW_DAYS) * len(SHOW_SLOT_HOURS)
+    venue_slots, artist_slots = Bitmap(len(venues) * slots), Bitmap(len(artists) * slots)
+    skipped = 0
+    for _ in range(count):
+        for _ in range(tries):
+            venue = rng.choices(venues, cum_weights=venue_weights)[0]
+            artist = rng.choices(artists, cum_weights=artist_weights)[0]
+            slot = rng.randrange(slots)
+            if venue * slots + slot not in venue_slots and \
+                    artist * slots + slot not in artist_slots:
+                break
+        else:
+            skipped += 1
+            continue
+        venue_slots.add(venue * slots + slot)
+        artist_slots.add(artist * slots + slot)
+        day, hour = divmod(slot, len(SHOW_SLOT_HOURS))
+        start_time = (now + timedelta(days=SHOW_DAYS[day])) \
+            .replace(hour=SHOW_SLOT_HOURS[hour], minute=0, second=0, microsecond=0)
+        yield {
+            'venue_id': venue_ids[venue],
+            'artist_id': artist_ids[artist],
+            'start_time': start_time,
+            'end_time': start_time + timedelta(minutes=rng.choice((60, 90, 120, 150))),
+        }
+    if skipped:
+        click.echo(f'shows: {skipped} left out, no free slot for their venue and artist')
+
+
+def insert(table, rows, batch_size, label):
+    started = time.perf_counter()
+    total = 0
+    for batch in batched(rows, batch_size):
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        total += len(batch)
+    elapsed = time.perf_counter() - started
+    click.echo(f'{label}: {total} rows in {elapsed:.1f}s '
+               f'({total / elapsed if elapsed else 0:.0f} rows/s)')
+
+
+def seed(venues, artists, shows, random_seed=0, batch_size=5000):
+    rng = random.Random(random_seed)
+    now = datetime.now()
+    insert(Venue.__table__, venue_rows(rng, venues, now), batch_size, 'venues')
+    insert(Artist.__table__, artist_rows(rng, artists, now), batch_size, 'artists')
+    link_all_genres(batch_size)
+    if shows:
+        venue_ids = [id for id, in db.session.query(Venue.id).order_by(Venue.id)]
+        artist_ids = [id for id, in db.session.query(Artist.id).order_by(Artist.id)]
+        rng.shuffle(venue_ids)
+        rng.shuffle(artist_ids)
+        insert(Show.__table__, show_rows(rng, shows, venue_ids, artist_ids, now),
+               batch_size, 'shows')
+        for model, key in SHOW_OWNERS:
+            refresh_counters(db.session.connection(), model, key)
+        db.session.commit()
+
+
+def init_app(app):
+    @app.cli.command('seed')
+    @click.option('--venues', default=1000, show_default=True)
+    @click.option('--artists', default=2000, show_default=True)
+    @click.option('--shows', default=20000, show_default=True)
+    @click.option('--seed', 'random_seed', default=0, show_default=True,
+                  help='Random seed; the same seed gives the same dataset.')
+    @click.option('--batch-size', default=5000, show_default=True)
+    def seed_command(venues, artists, shows, random_seed, batch_size):
+        """Fill the database with synthetic venues, artists and shows."""
+        seed(venues, artists, shows, random_seed, batch_size)
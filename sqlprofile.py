@@ -0,0 +1,188 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import g, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+#----------------------------------------------------------------------------#
+# SQL profiling.
+#
+# Every statement executed on any engine is recorded into the collectors
+# active on the current thread: one per request (see init_app) plus any
+# opened with ``count_queries()``. At the end of a request the totals are
+# folded into per-route aggregates, and a warning names the route when it
+# ran more statements than its budget or repeated one statement template
+# often enough to look like an N+1 loop.
+#----------------------------------------------------------------------------#
+
+SLOWEST_KEPT = 5
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def statement_template(statement):
+    """Collapse literal lists so IN (?, ?, ?) and IN (?, ?) count as one shape."""
+    statement = re.sub(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)',
+                       '(...)', statement)
+    return ' '.join(statement.split())
+
+
+class QueryLog:
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.templates = Counter()
+        self.slowest = []
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.templates[statement_template(statement)] += 1
+        self.slowest.append((duration, statement))
+        self.slowest.sort(key=lambda item: item[0], reverse=True)
+        del self.slowest[SLOWEST_KEPT:]
+
+    def repeated(self, threshold):
+        return [(template, n) for template, n in self.templates.most_common()
+                if n >= threshold]
+
+    def summary(self):
+        return {
+            'queries': self.count,
+            'db_ms': round(self.duration * 1000, 3),
+            'slowest': [{'ms': round(duration * 1000, 3), 'statement': statement}
+                        for duration, statement in self.slowest],
+            'repeated': [{'count': n, 'statement': template}
+                         for template, n in self.repeated(2)],
+        }
+
+
+def _collectors():
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    return _local.collectors
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('sqlprofile_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['sqlprofile_started'].pop()
+    for log in _collectors():
+        log.record(statement, duration)
+
+
+@contextmanager
+def count_queries(budget=None):
+    """Collect the statements run inside the block; fail if over ``budget``.
+
+        with count_queries(budget=1) as log:
+            venue_areas()
+    """
+    log = QueryLog()
+    _collectors().append(log)
+    try:
+        yield log
+    finally:
+        _collectors().remove(log)
+    if budget is not None and log.count > budget:
+        raise QueryBudgetExceeded(
+            f'{log.count} queries over a budget of {budget}: {log.summary()}')
+
+
+class RouteStats:
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.duration = 0.0
+        self.max_queries = 0
+        self.slowest = []
+
+    def add(self, log):
+        self.requests += 1
+        self.queries += log.count
+        self.duration += log.duration
+        self.max_queries = max(self.max_queries, log.count)
+        self.slowest = sorted(self.slowest + log.slowest,
+                              key=lambda item: item[0], reverse=True)[:SLOWEST_KEPT]
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'queries_avg': round(self.queries / self.requests, 2),
+            'queries_max': self.max_queries,
+            'db_ms_avg': round(self.duration * 1000 / self.requests, 3),
+            'slowest': [{'ms': round(duration * 1000, 3), 'statement': statement}
+                        for duration, statement in self.slowest],
+        }
+
+
+def init_app(app):
+    app.config.setdefault('SQL_QUERY_BUDGET', 20)
+    app.config.setdefault('SQL_REPEAT_THRESHOLD', 5)
+    app.config.setdefault('SQL_ROUTE_BUDGETS', {})
+    app.config.setdefault('SQL_DEBUG_HEADERS', app.debug)
+    app.config.setdefault('SQL_DEBUG_ENDPOINT', app.debug)
+
+    routes = defaultdict(RouteStats)
+    lock = threading.Lock()
+
+    @app.before_request
+    def start_query_log():
+        g.query_log = QueryLog()
+        _collectors().append(g.query_log)
+
+    @app.after_request
+    def finish_query_log(response):
+        log = g.pop('query_log', None)
+        if log is None:
+            return response
+        _collectors().remove(log)
+        route = request.endpoint or request.path
+        with lock:
+            routes[route].add(log)
+
+        budget = app.config['SQL_ROUTE_BUDGETS'].get(
+            route, app.config['SQL_QUERY_BUDGET'])
+        repeated = log.repeated(app.config['SQL_REPEAT_THRESHOLD'])
+        if log.count > budget:
+            app.logger.warning('sql: %s ran %d queries (budget %d) in %.1f ms',
+                               route, log.count, budget, log.duration * 1000)
+            if app.testing:
+                raise QueryBudgetExceeded(
+                    f'{route} ran {log.count} queries over a budget of {budget}')
+        for template, n in repeated:
+            app.logger.warning('sql: %s repeated a statement %d times '
+                               '(possible N+1): %s', route, n, template)
+
+        if app.config['SQL_DEBUG_HEADERS']:
+            response.headers['X-SQL-Queries'] = str(log.count)
+            response.headers['X-SQL-Time-ms'] = f'{log.duration * 1000:.3f}'
+        return response
+
+    @app.teardown_request
+    def drop_query_log(error=None):
+        # after_request handlers are skipped when the view raised.
+        log = g.pop('query_log', None)
+        if log is not None and log in _collectors():
+            _collectors().remove(log)
+
+    def sql_stats():
+        with lock:
+            return jsonify({route: stats.summary() for route, stats in routes.items()})
+
+    if app.config['SQL_DEBUG_ENDPOINT']:
+        app.add_url_rule('/debug/sql', view_func=sql_stats)
@@ -2,3 +2,38 @@ window.parseISOString = function parseISOString(s) {
   var b = s.split(/\D+/);
   return new Date(Date.UTC(b[0], --b[1], b[2], b[3], b[4], b[5], b[6]));
 };
+
+// Typeahead for inputs marked with data-autocomplete="venues|artists".
+// Suggestions fill a <datalist>; data-autocomplete-value="id" makes the
+// option value the record id (the name is shown as its label).
+document.addEventListener('DOMContentLoaded', function () {
+  var inputs = document.querySelectorAll('input[data-autocomplete]');
+  Array.prototype.forEach.call(inputs, function (input, n) {
+    var type = input.getAttribute('data-autocomplete');
+    var useId = input.getAttribute('data-autocomplete-value') === 'id';
+    var list = document.createElement('datalist');
+    var pending = null;
+    list.id = 'autocomplete-' + n;
+    input.setAttribute('list', list.id);
+    input.parentNode.appendChild(list);
+
+    input.addEventListener('input', function () {
+      clearTimeout(pending);
+      pending = setTimeout(function () {
+        var q = input.value.trim();
+        if (!q) { list.innerHTML = ''; return; }
+        fetch('/autocomplete?type=' + type + '&q=' + encodeURIComponent(q))
+          .then(function (response) { return response.json(); })
+          .then(function (data) {
+            list.innerHTML = '';
+            (data[type] || []).forEach(function (item) {
+              var option = document.createElement('option');
+              option.value = useId ? item.id : item.name;
+              option.label = item.name;
+              list.appendChild(option);
+            });
+          });
+      }, 80);
+    });
+  });
+});
@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+#----------------------------------------------------------------------------#
+# Test setup.
+#
+# config.py reads the environment at import, so the app is pointed at two
+# throwaway SQLite files before it is imported: the primary and one read
+# replica (bind replica_1). The replica is a copy of the primary taken by
+# ``replicate()``; until a test calls it again the replica lags behind,
+# which is how the replica tests see stale reads.
+#----------------------------------------------------------------------------#
+
+DATA_DIR = tempfile.mkdtemp(prefix='fyyur-tests-')
+PRIMARY = os.path.join(DATA_DIR, 'primary.db')
+REPLICA = os.path.join(DATA_DIR, 'replica.db')
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + PRIMARY
+os.environ['DATABASE_REPLICA_URLS'] = 'sqlite:///' + REPLICA
+os.environ['THUMBNAIL_SIGNING_KEY'] = 'test-signing-key'
+os.environ['THUMBNAIL_CACHE_DIR'] = os.path.join(DATA_DIR, 'thumbnails')
+os.environ['TEMPLATE_BYTECODE_CACHE_DIR'] = os.path.join(DATA_DIR, 'jinja')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as flask_app  # noqa: E402
+import areas  # noqa: E402
+import autocomplete  # noqa: E402
+import recent  # noqa: E402
+import search  # noqa: E402
+from cache import MemoryBackend, page_cache  # noqa: E402
+from models import db, Artist, Show, Venue  # noqa: E402
+
+flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+
+
+def replicate():
+    """Copy the primary over the replica, as if replication caught up."""
+    with flask_app.app_context():
+        db.session.remove()
+        db.engines['replica_1'].dispose()
+    source, target = sqlite3.connect(PRIMARY), sqlite3.connect(REPLICA)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def reset_memory():
+    """Forget every per-process index, list and cached page."""
+    for index in autocomplete.INDEXES.values():
+        index.loaded_at = None
+    areas.venues.loaded_at = None
+    for listing in recent.LISTS.values():
+        listing.loaded_at = None
+    page_cache.backend = MemoryBackend(flask_app.config['PAGE_CACHE_MAX_ENTRIES'],
+                                       flask_app.config['PAGE_CACHE_MAX_BYTES'])
+    flask_app.extensions['replicas'].down_until.clear()
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    for path in (PRIMARY, REPLICA):
+        if os.path.exists(path):
+            os.remove(path)
+    with flask_app.app_context():
+        db.create_all(bind_key=None)
+        with db.engine.begin() as connection:
+            search.install_sqlite_fts(connection)
+    replicate()
+    reset_memory()
+    yield flask_app
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def catch_up(app):
+    """``replicate``, for tests that write behind the app's back."""
+    return replicate
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def listings(app):
+    """A few venues, artists and shows on the primary and the replica."""
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    with app.app_context():
+        venues = [
+            Venue(name='The Musical Hop', city='San Francisco', state='CA',
+                  address='1015 Folsom Street', genres=['Jazz', 'Reggae', 'Swing']),
+            Venue(name='Park Square Live Music & Coffee', city='San Francisco',
+                  state='CA', address='34 Whiskey Moore Ave', genres=['Rock n Roll', 'Jazz']),
+            Venue(name='The Dueling Pianos Bar', city='New York', state='NY',
+                  address='335 Delancey Street', genres=['Classical', 'R&B']),
+        ]
+        artists = [
+            Artist(name='Guns N Petals', city='San Francisco', state='CA',
+                   genres='Rock n Roll'),
+            Artist(name='Matt Quevedo', city='New York', state='NY', genres='Jazz'),
+            Artist(name='The Wild Sax Band', city='San Francisco', state='CA',
+                   genres='Jazz,Classical'),
+        ]
+        db.session.add_all(venues + artists)
+        db.session.flush()
+        db.session.add_all([
+            Show(venue_id=venues[0].id, artist_id=artists[0].id,
+                 start_time=now - timedelta(days=30)),
+            Show(venue_id=venues[0].id, artist_id=artists[1].id,
+                 start_time=now + timedelta(days=7)),
+            Show(venue_id=venues[1].id, artist_id=artists[2].id,
+                 start_time=now + timedelta(days=14)),
+        ])
+        db.session.commit()
+        ids = {'venues': [venue.id for venue in venues],
+               'artists': [artist.id for artist in artists]}
+    replicate()
+    return ids
@@ -0,0 +1,37 @@
+import pytest
+
+
+def test_unmatched_api_url_is_json(client):
+    response = client.get('/api/v1/nope')
+    assert response.status_code == 404
+    assert response.get_json()['error'] == 'Not Found'
+
+
+def test_api_method_not_allowed_is_json(client):
+    response = client.post('/api/v1/venues')
+    assert response.status_code == 405
+    assert response.get_json()['error'] == 'Method Not Allowed'
+
+
+def test_api_bad_argument_is_json(client):
+    response = client.get('/api/v1/venues?limit=0')
+    assert response.status_code == 400
+    assert 'limit' in response.get_json()['description']
+
+
+def test_api_server_error_is_json(app, client, monkeypatch):
+    def broken():
+        raise RuntimeError('boom')
+
+    monkeypatch.setitem(app.config, 'PROPAGATE_EXCEPTIONS', False)
+    monkeypatch.setitem(app.view_functions, 'api_v1.genres', broken)
+    response = client.get('/api/v1/genres')
+    assert response.status_code == 500
+    assert response.get_json()['error'] == 'Internal Server Error'
+
+
+@pytest.mark.parametrize('path', ['/nope', '/api/v1nope'])
+def test_pages_keep_html_errors(client, path):
+    response = client.get(path)
+    assert response.status_code == 404
+    assert response.mimetype == 'text/html'
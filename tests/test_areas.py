@@ -0,0 +1,20 @@
+import areas
+
+
+def test_state_and_city_pages(client, listings):
+    response = client.get('/venues/CA')
+    assert response.status_code == 200
+    assert b'San Francisco' in response.data
+
+    response = client.get('/venues/CA/San Francisco')
+    assert response.status_code == 200
+    assert b'The Musical Hop' in response.data
+    assert b'Dueling Pianos' not in response.data
+
+
+def test_stats_report_the_size_measured_at_load(client, listings):
+    client.get('/venues/CA')
+    stats = client.get('/areas/stats').get_json()
+    assert (stats['states'], stats['venues']) == (2, 3)
+    assert stats['memory_bytes'] == areas.memory_usage(areas.venues._states,
+                                                       areas.venues._venues)
@@ -0,0 +1,32 @@
+import autocomplete
+from models import db, Venue
+
+
+def test_completes_word_starts(client, listings):
+    response = client.get('/autocomplete?q=pian&type=venues')
+    assert [venue['name'] for venue in response.get_json()['venues']] == \
+        ['The Dueling Pianos Bar']
+
+
+def test_reloads_once_older_than_max_age(app, client, listings, catch_up):
+    assert client.get('/autocomplete?q=saloon&type=venues').get_json()['venues'] == []
+
+    # Written by another process: not seen until the index is too old.
+    with app.app_context():
+        db.session.add(Venue(name='The Saloon', city='Austin', state='TX'))
+        db.session.commit()
+    catch_up()
+    assert client.get('/autocomplete?q=saloon&type=venues').get_json()['venues'] == []
+
+    autocomplete.venues.loaded_at -= autocomplete.venues.max_age + 1
+    names = [venue['name'] for venue in
+             client.get('/autocomplete?q=saloon&type=venues').get_json()['venues']]
+    assert names == ['The Saloon']
+
+
+def test_stats_report_the_size_measured_at_load(client, listings):
+    client.get('/autocomplete?q=a')
+    stats = client.get('/autocomplete/stats').get_json()['venues']
+    assert stats['loaded'] and stats['names'] == 3
+    assert stats['memory_bytes'] == autocomplete.memory_usage(
+        autocomplete.venues._keys, autocomplete.venues._names)
@@ -0,0 +1,26 @@
+from test_venues import ARTIST_FORM
+
+
+def test_counterpart_rename_changes_the_page(app, client, listings, catch_up):
+    # Matt Quevedo plays The Musical Hop.
+    path = f'/venues/{listings["venues"][0]}'
+    etag = client.get(path).headers['ETag']
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+    # From another client: the edit's flash message would force a render.
+    app.test_client().post(f'/artists/{listings["artists"][1]}/edit',
+                data=dict(ARTIST_FORM, name='Matt Quevedo Trio'))
+    catch_up()
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert b'Matt Quevedo Trio' in response.data
+
+
+def test_unrelated_edit_keeps_the_page(app, client, listings, catch_up):
+    path = f'/venues/{listings["venues"][2]}'
+    etag = client.get(path).headers['ETag']
+    # From another client: the edit's flash message would force a render.
+    app.test_client().post(f'/artists/{listings["artists"][1]}/edit',
+                data=dict(ARTIST_FORM, name='Matt Quevedo Trio'))
+    catch_up()
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,17 @@
+from details import load_artist
+from models import db, Artist
+
+
+def test_artist_genres_split_like_the_genre_links(app, listings):
+    with app.app_context():
+        artist = db.session.get(Artist, listings['artists'][2])
+        # Older edits joined genres with '.'.
+        artist.genres = 'Jazz. Classical,,Jazz'
+        db.session.commit()
+        assert load_artist(artist.id)['genres'] == ['Classical', 'Jazz']
+
+
+def test_artist_page(client, listings):
+    response = client.get(f'/artists/{listings["artists"][2]}')
+    assert response.status_code == 200
+    assert b'Classical' in response.data
@@ -0,0 +1,26 @@
+import json
+from datetime import datetime
+
+from models import db, Venue
+
+
+def exported_names(client, query):
+    response = client.get(f'/export/venues.ndjson?{query}')
+    assert response.status_code == 200
+    return {json.loads(line)['name'] for line in response.data.splitlines()}
+
+
+def test_since_includes_changed_rows(app, client, listings, catch_up):
+    since = datetime.now()
+    assert exported_names(client, f'since={since.isoformat()}') == set()
+
+    with app.app_context():
+        db.session.get(Venue, listings['venues'][2]).phone = '212-555-0000'
+        db.session.commit()
+    catch_up()
+    assert exported_names(client, f'since={since.isoformat()}') == {'The Dueling Pianos Bar'}
+
+
+def test_shows_have_no_since(client, listings):
+    assert client.get('/export/shows.csv?since=2020-01-01').status_code == 400
+    assert client.get('/export/shows.csv?after_id=1').status_code == 200
@@ -0,0 +1,34 @@
+import csv
+
+from importer import run_import
+from models import db, Venue
+
+
+def test_rows_written_outside_the_orm_get_updated_at(app):
+    # Like COPY, plain SQL gets none of the model's Python-side defaults.
+    with app.app_context():
+        db.session.execute(db.text(
+            "INSERT INTO venues (name, created_date, version, upcoming_shows_count, "
+            "past_shows_count) VALUES ('Copied In', CURRENT_TIMESTAMP, 1, 0, 0)"))
+        db.session.commit()
+        assert db.session.query(Venue.updated_at).scalar() is not None
+
+
+def test_import_venues(app, tmp_path):
+    path = tmp_path / 'venues.csv'
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, ['name', 'city', 'state', 'address', 'phone',
+                                    'genres', 'facebook_link', 'image_link', 'website'])
+        writer.writeheader()
+        writer.writerow({'name': 'The Saloon', 'city': 'Austin', 'state': 'TX',
+                         'address': '1 Main St', 'phone': '512-555-1234',
+                         'genres': 'Blues,Jazz',
+                         'facebook_link': 'https://www.facebook.com/saloon',
+                         'image_link': 'https://example.com/saloon.jpg',
+                         'website': 'https://saloon.example.com'})
+    with app.test_request_context():
+        state = run_import('venues', str(path), echo=lambda message: None)
+        assert (state['inserted'], state['rejected']) == (1, 0)
+        venue = Venue.query.one()
+        assert venue.genres == ['Blues', 'Jazz']
+        assert venue.updated_at == venue.created_date
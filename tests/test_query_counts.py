@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Artist, Show, Venue
+from sqlprofile import QueryBudgetExceeded, count_queries
+
+# Statements per request, whatever the number of rows on the page: each
+# of these pages used to run a query (or several) per listed row.
+
+
+@pytest.fixture
+def crowd(listings, app, catch_up):
+    """Enough venues, artists and shows that a per-row query would show."""
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    with app.app_context():
+        venues = [Venue(name=f'Venue {n}', city=f'City {n % 4}', state=('CA', 'NY', 'TX')[n % 3],
+                        genres=['Jazz', 'Folk'][:n % 2 + 1]) for n in range(30)]
+        artists = [Artist(name=f'Artist {n}', city='Austin', state='TX',
+                          genres='Jazz,Folk' if n % 2 else 'Blues') for n in range(30)]
+        db.session.add_all(venues + artists)
+        db.session.flush()
+        db.session.add_all(
+            Show(venue_id=venues[n].id, artist_id=artists[n].id,
+                 start_time=now + timedelta(days=n - 15, hours=n % 3))
+            for n in range(30))
+        db.session.commit()
+        ids = {'venue': venues[0].id, 'artist': artists[0].id}
+    catch_up()
+    return ids
+
+
+def get(client, path, budget, **kwargs):
+    with count_queries(budget=budget):
+        response = client.get(path, **kwargs)
+    assert response.status_code in (200, 304), path
+    return response
+
+
+def test_budget_is_enforced(client, crowd):
+    with pytest.raises(QueryBudgetExceeded):
+        get(client, '/venues', budget=0)
+
+
+# user-001: venues grouped by area, one page query plus the genre facets.
+def test_venues(client, crowd):
+    get(client, '/venues', budget=2)
+    get(client, '/venues?genre=Jazz', budget=2)
+    # Then from the page cache.
+    get(client, '/venues', budget=0)
+
+
+# user-002: the show feeds are one keyset query each.
+def test_shows(client, crowd):
+    get(client, '/shows', budget=1)
+    get(client, '/shows?when=past', budget=1)
+
+
+# user-005: a version lookup, then the page in one query; a revalidation
+# that still matches needs only the lookup.
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_detail_pages(client, crowd, kind):
+    path = f'/{kind}s/{crowd[kind]}'
+    response = get(client, path, budget=2)
+    response = get(client, path, budget=1,
+                   headers={'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+
+
+# user-018: listings read stored show counts, and rows whose next show has
+# since started are recounted in the same statement.
+def test_counters(app, client, crowd, catch_up):
+    with app.app_context():
+        venue = db.session.get(Venue, crowd['venue'])
+        started = datetime.now() - timedelta(minutes=1)
+        db.session.execute(db.update(Venue).where(Venue.id != venue.id)
+                           .values(next_show_time=started))
+        db.session.commit()
+    catch_up()
+    get(client, '/venues', budget=2)
+    get(client, '/artists', budget=2)
+    with count_queries(budget=2):
+        assert client.post('/venues/search', data={'search_term': 'venue'}).status_code == 200
+
+
+# user-025: the home page's recent listings come from memory once loaded.
+def test_home_page(client, crowd):
+    get(client, '/', budget=2)
+    get(client, '/?fresh', budget=0)
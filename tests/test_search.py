@@ -0,0 +1,28 @@
+from models import db, Venue
+
+
+def test_venue_genres_round_trip_on_sqlite(app, listings):
+    with app.app_context():
+        venue = db.session.get(Venue, listings['venues'][0])
+        assert venue.genres == ['Jazz', 'Reggae', 'Swing']
+
+
+def test_search_venues_page(client, listings):
+    response = client.post('/venues/search', data={'search_term': 'hop'})
+    assert response.status_code == 200
+    assert b'The Musical Hop' in response.data
+    assert b'Dueling Pianos' not in response.data
+
+
+def test_search_artists_page(client, listings):
+    response = client.post('/artists/search', data={'search_term': 'sax'})
+    assert response.status_code == 200
+    assert b'The Wild Sax Band' in response.data
+    assert b'Guns N Petals' not in response.data
+
+
+def test_search_venues_api_matches_genres(client, listings):
+    response = client.get('/api/v1/venues/search?q=jazz')
+    assert response.status_code == 200
+    names = {venue['name'] for venue in response.get_json()['data']}
+    assert names == {'The Musical Hop', 'Park Square Live Music & Coffee'}
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Show
+
+
+@pytest.fixture
+def one_per_page(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'SHOWS_PAGE_SIZE', 1)
+
+
+def test_pager_goes_later_through_upcoming_shows(client, listings, one_per_page):
+    response = client.get('/shows')
+    assert b'Later shows' in response.data
+
+
+def test_pager_goes_earlier_through_past_shows(app, client, listings, one_per_page, catch_up):
+    with app.app_context():
+        db.session.add(Show(venue_id=listings['venues'][1], artist_id=listings['artists'][1],
+                            start_time=datetime.now() - timedelta(days=60)))
+        db.session.commit()
+    catch_up()
+    response = client.get('/shows?when=past')
+    assert b'Earlier shows' in response.data
+    assert b'Later shows' not in response.data
+
+
+@pytest.mark.parametrize('query', ['from=garbage', 'to=2026-13-01', 'when=soon'])
+def test_malformed_arguments(client, listings, query):
+    assert client.get(f'/shows?{query}').status_code == 400
+
+
+def test_window(client, listings):
+    response = client.get('/shows?from=2000-01-01&to=2000-01-02')
+    assert response.status_code == 200
+    assert b'playing at' not in response.data
+
+
+def show_form(listings, **fields):
+    start = datetime.now().replace(microsecond=0) + timedelta(days=100)
+    return dict({'venue_id': listings['venues'][2], 'artist_id': listings['artists'][2],
+                 'start_time': start.strftime('%Y-%m-%d %H:%M:%S'), 'duration': 120},
+                **fields)
+
+
+def test_create_show(app, client, listings):
+    response = client.post('/shows/create', data=show_form(listings))
+    assert response.status_code == 200
+    assert b'Show was successfully listed!' in response.data
+    with app.app_context():
+        assert Show.query.count() == 4
+
+
+@pytest.mark.parametrize('kind', ['venue', 'artist'])
+def test_create_show_for_a_missing_owner(app, client, listings, kind):
+    response = client.post('/shows/create', data=show_form(listings, **{f'{kind}_id': 999999}))
+    assert response.status_code == 400
+    assert f'No {kind} 999999'.encode() in response.data
+    with app.app_context():
+        assert Show.query.count() == 3
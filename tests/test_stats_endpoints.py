@@ -0,0 +1,29 @@
+from flask import Flask
+
+import pooling
+import recent
+
+
+def stats_routes(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    logger = pooling.telemetry.logger
+    try:
+        pooling.init_app(app)
+    finally:
+        pooling.telemetry.logger = logger
+    recent.init_app(app)
+    return {rule.rule for rule in app.url_map.iter_rules() if rule.rule.endswith('/stats')}
+
+
+def test_stats_endpoints_are_off_unless_enabled():
+    assert stats_routes() == set()
+    assert stats_routes(STATS_ENDPOINTS=False) == set()
+
+
+def test_stats_endpoints_when_enabled():
+    assert stats_routes(STATS_ENDPOINTS=True) == {'/pool/stats', '/recent/stats'}
+
+
+def test_pool_stats(client):
+    assert client.get('/pool/stats').get_json()['pool']
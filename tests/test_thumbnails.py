@@ -0,0 +1,169 @@
+import io
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from flask import Flask
+
+import thumbnails
+from thumbnails import FetchError, RecentFailures, fetch
+
+
+def png(width, height):
+    Image = pytest.importorskip('PIL.Image')
+    out = io.BytesIO()
+    Image.new('RGB', (width, height), 'purple').save(out, 'PNG')
+    return out.getvalue()
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """An image host: /image.png, a redirect to it, and a page that is not an image."""
+
+    image = b''
+    requested = []
+    hosts = []
+
+    def do_GET(self):
+        self.requested.append(self.path)
+        self.hosts.append(self.headers['Host'])
+        if self.path == '/image.png':
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(self.image)))
+            self.end_headers()
+            self.wfile.write(self.image)
+        elif self.path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', '/image.png')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+            self.wfile.write(b'hi')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def image_host():
+    server = HTTPServer(('127.0.0.1', 0), StandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StandIn.requested, StandIn.hosts = [], []
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def allow_private(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'THUMBNAIL_ALLOW_PRIVATE', True)
+
+
+def thumbnail_path(app, link, size='small'):
+    with app.test_request_context():
+        return app.jinja_env.globals['thumbnail_url'](link, size)
+
+
+def test_thumbnail_is_resized(app, client, image_host, allow_private):
+    Image = pytest.importorskip('PIL.Image')
+    StandIn.image = png(800, 400)
+    link = f'{image_host}/image.png'
+
+    response = client.get(thumbnail_path(app, link))
+    assert response.status_code == 200
+    assert Image.open(io.BytesIO(response.data)).size == (200, 100)
+
+    # Every size was rendered from the one fetch.
+    response = client.get(thumbnail_path(app, link, 'large'))
+    assert Image.open(io.BytesIO(response.data)).size == (600, 300)
+    assert StandIn.requested == ['/image.png']
+
+
+def test_redirects_are_not_followed(app, client, image_host, allow_private):
+    link = f'{image_host}/redirect'
+    response = client.get(thumbnail_path(app, link))
+    assert response.status_code == 302
+    assert response.headers['Location'] == link
+    assert StandIn.requested == ['/redirect']
+
+
+def test_failed_links_are_not_retried_at_once(app, client, image_host, allow_private):
+    link = f'{image_host}/page'
+    for _ in range(2):
+        assert client.get(thumbnail_path(app, link)).headers['Location'] == link
+    assert StandIn.requested == ['/page']
+
+
+def test_private_addresses_are_refused(image_host):
+    with pytest.raises(FetchError, match='non-public'):
+        fetch(f'{image_host}/image.png', timeout=5, max_bytes=2 ** 20)
+    assert StandIn.requested == []
+
+
+def test_fetch_connects_to_the_vetted_address(image_host, monkeypatch):
+    port = int(image_host.rsplit(':', 1)[1])
+    lookups = []
+    resolve = socket.getaddrinfo
+
+    def getaddrinfo(host, *args, **kwargs):
+        if host != 'images.example':
+            return resolve(host, *args, **kwargs)
+        # A host that would resolve elsewhere on a second lookup.
+        lookups.append(host)
+        address = '127.0.0.1' if len(lookups) == 1 else '10.1.2.3'
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (address, port))]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', getaddrinfo)
+    StandIn.image = b'GIF89a'
+    assert fetch(f'http://images.example:{port}/image.png', timeout=5,
+                 max_bytes=2 ** 20, allow_private=True) == b'GIF89a'
+    assert lookups == ['images.example']
+    assert StandIn.hosts == [f'images.example:{port}']
+
+
+def test_forged_tokens_are_refused(client):
+    assert client.get('/thumbnails/small/not-a-token').status_code == 404
+
+
+def test_recent_failures_expire_and_are_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    failed = RecentFailures(retry_after=60, max_entries=2)
+    for url in ('a', 'b', 'c'):
+        failed.add(url)
+    assert 'a' not in failed
+    assert 'b' in failed and 'c' in failed
+    now[0] += 61
+    assert 'b' not in failed
+    assert len(failed) == 1
+
+
+def test_unsigned_links_without_a_signing_key():
+    app = Flask(__name__)
+    thumbnails.init_app(app)
+    with app.test_request_context():
+        link = 'https://example.com/image.png'
+        assert app.jinja_env.globals['thumbnail_url'](link) == link
+    assert 'thumbnail' not in app.view_functions
+
+
+def test_served_when_storing_evicts_it(app, client, image_host, allow_private, monkeypatch):
+    Image = pytest.importorskip('PIL.Image')
+    StandIn.image = png(800, 400)
+    monkeypatch.setattr(app.extensions['thumbnails'], 'max_bytes', 10)
+    link = f'{image_host}/image.png'
+
+    for _ in range(2):
+        response = client.get(thumbnail_path(app, link))
+        assert response.status_code == 200
+        assert response.mimetype == 'image/jpeg'
+        assert Image.open(io.BytesIO(response.data)).size == (200, 100)
+    # Nothing stays cached, so every request fetches again.
+    assert StandIn.requested == ['/image.png', '/image.png']
@@ -0,0 +1,72 @@
+from models import db, Artist, Genre, Venue
+
+VENUE_FORM = {
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA',
+    'address': '1015 Folsom Street', 'phone': '415-555-1234',
+    'image_link': 'https://example.com/hop.jpg',
+    'facebook_link': 'https://www.facebook.com/TheMusicalHop',
+    'website_link': 'https://www.themusicalhop.com',
+    'genres': ['Jazz', 'Folk'], 'seeking_description': '',
+}
+
+
+def genre_counts(app):
+    with app.app_context():
+        return {genre.name: genre.venue_count for genre in Genre.query}
+
+
+def test_delete_venue_runs_the_model_hooks(app, client, listings):
+    venue_id, artist_id = listings['venues'][0], listings['artists'][1]
+    assert genre_counts(app)['Reggae'] == 1
+
+    response = client.delete(f'/venues/{venue_id}')
+    assert response.status_code == 200
+    assert response.get_json() == {'success': True}
+
+    counts = genre_counts(app)
+    assert counts['Reggae'] == 0
+    assert counts['Jazz'] == 1
+    with app.app_context():
+        assert db.session.get(Venue, venue_id) is None
+        # Its upcoming show went with it.
+        assert db.session.get(Artist, artist_id).upcoming_shows_count == 0
+
+
+def test_delete_missing_venue(client, listings):
+    assert client.delete('/venues/999999').status_code == 404
+
+
+def test_edit_venue_keeps_genres_a_list(app, client, listings):
+    venue_id = listings['venues'][0]
+    response = client.post(f'/venues/{venue_id}/edit', data=VENUE_FORM)
+    assert response.status_code == 302
+
+    with app.app_context():
+        venue = db.session.get(Venue, venue_id)
+        assert venue.genres == ['Jazz', 'Folk']
+        assert venue.website == 'https://www.themusicalhop.com'
+    counts = genre_counts(app)
+    assert counts['Folk'] == 1
+    assert counts['Reggae'] == 0
+
+
+ARTIST_FORM = {
+    'name': 'Guns N Roses', 'city': 'San Francisco', 'state': 'CA',
+    'phone': '415-555-4321', 'image_link': 'https://example.com/gnp.jpg',
+    'facebook_link': 'https://www.facebook.com/GunsNPetals',
+    'website_link': 'https://www.gunsnpetalsband.com',
+    'genres': ['Rock n Roll', 'Blues'], 'seeking_description': '',
+}
+
+
+def test_edit_artist_joins_genres(app, client, listings):
+    artist_id = listings['artists'][0]
+    response = client.post(f'/artists/{artist_id}/edit', data=ARTIST_FORM)
+    assert response.status_code == 302
+
+    with app.app_context():
+        artist = db.session.get(Artist, artist_id)
+        assert artist.name == 'Guns N Roses'
+        assert artist.website == 'https://www.gunsnpetalsband.com'
+        assert artist.genres == 'Rock n Roll,Blues'
+        assert {genre.name: genre.artist_count for genre in Genre.query}['Blues'] == 1
@@ -0,0 +1,358 @@
+import hashlib
+import http.client
+import io
+import ipaddress
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import click
+from flask import abort, jsonify, redirect, send_file, url_for
+from itsdangerous import BadSignature, URLSafeSerializer
+
+try:
+    from PIL import Image
+except ImportError:  # without Pillow images are cached and served at full size
+    Image = None
+
+#----------------------------------------------------------------------------#
+# Thumbnail proxy.
+#
+# Templates turn an image_link into ``thumbnail_url(link, 'small')``, a
+# signed /thumbnails/<size>/<token> URL, so only links the app rendered can
+# be fetched. The first request fetches the image, writes every preset size
+# to a content-addressed disk cache (blobs/<sha256 of the source>-<size>)
+# and records which blob the link resolved to; from then on all sizes are
+# served from disk. The cache is kept under THUMBNAIL_CACHE_MAX_BYTES by
+# evicting the least recently served blobs. Links that cannot be fetched or
+# decoded are redirected to, as before (and not retried for
+# THUMBNAIL_RETRY_AFTER seconds).
+#
+# A link's host is resolved once, every address it resolves to must be
+# public (unless THUMBNAIL_ALLOW_PRIVATE is set, e.g. for a local stand-in),
+# and the fetch connects to the vetted address itself, so a second lookup
+# cannot point it elsewhere. Redirects are not followed. Without a
+# THUMBNAIL_SIGNING_KEY nothing is proxied and templates link images
+# directly.
+#----------------------------------------------------------------------------#
+
+SIZES = {'small': 200, 'large': 600}
+CACHE_CONTROL = 'public, max-age=2592000'
+CHUNK = 64 * 1024
+
+
+class FetchError(Exception):
+    pass
+
+
+class ThumbnailCache:
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.total = None
+        self.evictions = 0
+
+    def _path(self, kind, name):
+        return os.path.join(self.directory, kind, name[:2], name)
+
+    def blob_path(self, digest, size):
+        return self._path('blobs', f'{digest}-{size}')
+
+    def lookup(self, url, size):
+        """The cached blob path for a link at ``size``, or None."""
+        try:
+            with open(self._path('links', _url_key(url))) as f:
+                path = self.blob_path(f.read().strip(), size)
+        except FileNotFoundError:
+            return None
+        return path if os.path.exists(path) else None
+
+    def store(self, url, digest, blobs):
+        for size, data in blobs.items():
+            self._write(self.blob_path(digest, size), data)
+        self._write(self._path('links', _url_key(url)), digest.encode('ascii'))
+        with self.lock:
+            self.total = self._usage() if self.total is None else \
+                self.total + sum(len(data) for data in blobs.values())
+            if self.total > self.max_bytes:
+                self._evict()
+
+    def touch(self, path):
+        # mtime doubles as last-served time for eviction.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+    def _blobs(self):
+        for root, _, names in os.walk(os.path.join(self.directory, 'blobs')):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _usage(self):
+        return sum(size for _, size, _ in self._blobs())
+
+    def _evict(self):
+        # Down to 90% so a full cache does not evict on every store.
+        target = self.max_bytes * 0.9
+        blobs = sorted(self._blobs())
+        self.total = sum(size for _, size, _ in blobs)
+        for _, size, path in blobs:
+            if self.total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            if self.total is None:
+                self.total = self._usage()
+            return {'bytes': self.total, 'max_bytes': self.max_bytes,
+                    'evictions': self.evictions}
+
+
+def _url_key(url):
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class RecentFailures:
+    """Links that failed in the last ``retry_after`` seconds; at most ``max_entries``."""
+
+    def __init__(self, retry_after, max_entries):
+        self.retry_after = retry_after
+        self.max_entries = max_entries
+        self._failed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, url):
+        with self._lock:
+            failed_at = self._failed.get(url)
+            if failed_at is None:
+                return False
+            if time.monotonic() - failed_at < self.retry_after:
+                return True
+            del self._failed[url]
+            return False
+
+    def add(self, url):
+        with self._lock:
+            self._failed[url] = time.monotonic()
+            self._failed.move_to_end(url)
+            while len(self._failed) > self.max_entries:
+                self._failed.popitem(last=False)
+
+    def __len__(self):
+        return len(self._failed)
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    """Talks to ``host`` (Host header) at an already vetted ``address``."""
+
+    def __init__(self, host, port, address, timeout):
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+
+    def __init__(self, host, port, address, timeout):
+        super().__init__(host, port, timeout=timeout)
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        # Certificates are checked against the link's host name, not the address.
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+CONNECTIONS = {'http': _PinnedHTTPConnection, 'https': _PinnedHTTPSConnection}
+
+
+def _resolve(host, port, allow_private):
+    """The address to connect to; every address ``host`` resolves to must be public."""
+    try:
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise FetchError(str(e))
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0])
+        if not allow_private and not address.is_global:
+            raise FetchError(f'{host} resolves to non-public {address}')
+    return addresses[0][4][0]
+
+
+def fetch(url, timeout, max_bytes, allow_private=False):
+    parts = urlsplit(url)
+    if parts.scheme not in CONNECTIONS or not parts.hostname:
+        raise FetchError(f'unsupported URL {url!r}')
+    try:
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+    except ValueError as e:
+        raise FetchError(str(e))
+    address = _resolve(parts.hostname, port, allow_private)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    connection = CONNECTIONS[parts.scheme](parts.hostname, port, address, timeout)
+    try:
+        connection.request('GET', path, headers={'User-Agent': 'fyyur-thumbnails'})
+        response = connection.getresponse()
+        # Redirects included: following one would skip the address check.
+        if response.status != 200:
+            raise FetchError(f'{url} answered {response.status}')
+        if not response.headers.get_content_type().startswith('image/'):
+            raise FetchError(f'{url} is {response.headers.get_content_type()}')
+        data = bytearray()
+        while len(data) <= max_bytes:
+            chunk = response.read(CHUNK)
+            if not chunk:
+                return bytes(data)
+            data += chunk
+    except (OSError, http.client.HTTPException) as e:
+        raise FetchError(str(e))
+    finally:
+        connection.close()
+    raise FetchError(f'{url} is larger than {max_bytes} bytes')
+
+
+def render_sizes(data):
+    """{size: image bytes} for every preset; the source as-is without Pillow."""
+    if Image is None:
+        return {size: data for size in SIZES}
+    try:
+        source = Image.open(io.BytesIO(data))
+        source.load()
+    except Exception as e:  # Pillow raises a variety of errors for bad input
+        raise FetchError(f'undecodable image: {e}')
+    blobs = {}
+    for size, pixels in SIZES.items():
+        image = source.copy()
+        image.thumbnail((pixels, pixels))
+        out = io.BytesIO()
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image.save(out, 'PNG', optimize=True)
+        else:
+            image.convert('RGB').save(out, 'JPEG', quality=82, optimize=True, progressive=True)
+        blobs[size] = out.getvalue()
+    return blobs
+
+
+def _mimetype(head):
+    """The image type of a blob from its first 12 bytes."""
+    if head.startswith(b'\x89PNG'):
+        return 'image/png'
+    if head.startswith(b'GIF8'):
+        return 'image/gif'
+    if head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def init_app(app):
+    app.config.setdefault('THUMBNAIL_CACHE_DIR', os.path.join(app.instance_path, 'thumbnails'))
+    app.config.setdefault('THUMBNAIL_CACHE_MAX_BYTES', 256 * 2 ** 20)
+    app.config.setdefault('THUMBNAIL_FETCH_TIMEOUT', 5)
+    app.config.setdefault('THUMBNAIL_MAX_SOURCE_BYTES', 10 * 2 ** 20)
+    app.config.setdefault('THUMBNAIL_ALLOW_PRIVATE', False)
+    app.config.setdefault('THUMBNAIL_SIGNING_KEY', None)
+    app.config.setdefault('THUMBNAIL_RETRY_AFTER', 300)
+    app.config.setdefault('THUMBNAIL_FAILED_MAX_ENTRIES', 10000)
+    app.config.setdefault('STATS_ENDPOINTS', app.debug)
+
+    cache = ThumbnailCache(app.config['THUMBNAIL_CACHE_DIR'],
+                           app.config['THUMBNAIL_CACHE_MAX_BYTES'])
+    app.extensions['thumbnails'] = cache
+    # Links that failed recently are redirected without another fetch.
+    failed = RecentFailures(app.config['THUMBNAIL_RETRY_AFTER'],
+                            app.config['THUMBNAIL_FAILED_MAX_ENTRIES'])
+
+    signing_key = app.config['THUMBNAIL_SIGNING_KEY']
+    serializer = URLSafeSerializer(signing_key, salt='thumbnail') if signing_key else None
+    if serializer is None:
+        app.logger.warning('thumbnails: THUMBNAIL_SIGNING_KEY is not set; '
+                           'image links are served directly')
+
+    @app.template_global()
+    def thumbnail_url(link, size='small'):
+        if not link or serializer is None:
+            return link
+        return url_for('thumbnail', size=size, token=serializer.dumps(link))
+
+    def thumbnail(size, token):
+        if size not in SIZES:
+            abort(404)
+        try:
+            url = serializer.loads(token)
+        except BadSignature:
+            abort(404)
+
+        path = cache.lookup(url, size)
+        try:
+            body = open(path, 'rb') if path is not None else None
+        except FileNotFoundError:  # evicted since the lookup
+            body = None
+        if body is not None:
+            cache.touch(path)
+            etag = os.path.basename(path)
+        else:
+            if url in failed:
+                return redirect(url)
+            try:
+                data = fetch(url, app.config['THUMBNAIL_FETCH_TIMEOUT'],
+                             app.config['THUMBNAIL_MAX_SOURCE_BYTES'],
+                             app.config['THUMBNAIL_ALLOW_PRIVATE'])
+                blobs = render_sizes(data)
+            except FetchError as e:
+                app.logger.info('thumbnail: serving %s directly: %s', url, e)
+                failed.add(url)
+                return redirect(url)
+            digest = hashlib.sha256(data).hexdigest()
+            cache.store(url, digest, blobs)
+            # Served from memory: storing may already have evicted it again.
+            body = io.BytesIO(blobs[size])
+            etag = f'{digest}-{size}'
+
+        head = body.read(12)
+        body.seek(0)
+        response = send_file(body, mimetype=_mimetype(head), etag=etag, conditional=True)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    def thumbnail_stats():
+        return jsonify(dict(cache.stats(), recent_failures=len(failed)))
+
+    if serializer is not None:
+        app.add_url_rule('/thumbnails/<size>/<token>', view_func=thumbnail)
+    if app.config['STATS_ENDPOINTS']:
+        app.add_url_rule('/thumbnails/stats', view_func=thumbnail_stats)
+
+    @app.cli.command('thumbnails')
+    @click.option('--prune', is_flag=True, help='Evict down to 90% of the size limit now.')
+    def thumbnails_command(prune):
+        """Show (or prune) the thumbnail cache."""
+        if prune:
+            with cache.lock:
+                cache._evict()
+        click.echo(cache.stats())